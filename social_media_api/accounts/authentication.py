@@ -0,0 +1,169 @@
+# accounts/authentication.py
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Entries kept in each process's LRU, and how long (seconds) one may be served
+# before it is re-checked against the shared cache. Invalidations reach other
+# processes only through the shared cache, so this bounds their staleness.
+TOKEN_AUTH_LRU_SIZE = getattr(settings, 'TOKEN_AUTH_LRU_SIZE', 1024)
+TOKEN_AUTH_LRU_TIMEOUT = getattr(settings, 'TOKEN_AUTH_LRU_TIMEOUT', 10)
+
+# Seconds a token -> user entry lives in the shared cache
+TOKEN_AUTH_CACHE_TIMEOUT = getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 300)
+
+# User columns never written to the cache; requests that need them load them on access
+PRIVATE_USER_FIELDS = ('password', 'email')
+
+
+def token_key(key):
+    # Raw tokens are credentials; keep only a digest in the shared cache
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def cacheable_user(user):
+    """
+    A copy of the user without PRIVATE_USER_FIELDS, as if loaded with
+    .defer(): accessing one queries the database, and save() only writes
+    the loaded fields, so a cached request.user cannot blank the password.
+    """
+    fields = [
+        field.attname for field in user._meta.concrete_fields
+        if field.attname not in PRIVATE_USER_FIELDS and field.attname not in user.get_deferred_fields()
+    ]
+    return type(user).from_db(user._state.db, fields, [getattr(user, name) for name in fields])
+
+
+class TokenUserCache:
+    """
+    Two-level token -> user cache.
+
+    The first level is a bounded in-process LRU; the second is the shared
+    Django cache, which stores token digest -> user ID and user ID -> user so
+    that a single user can be invalidated without knowing their token.
+    Cached users carry no password hash or email (see cacheable_user).
+    """
+
+    def __init__(self, max_size=1024, local_timeout=10, timeout=300):
+        self.max_size = max_size
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # token key -> (user, expires_at)
+        self._keys_by_user = {}  # user_id -> set of token keys
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return user
+                self._discard(key)
+
+        user_id = cache.get(token_key(key))
+        user = user_id is not None and cache.get(user_key(user_id))
+        if not user:
+            return None
+        self._remember(key, user)
+        return user
+
+    def set(self, key, user):
+        user = cacheable_user(user)
+        cache.set_many({token_key(key): user.pk, user_key(user.pk): user}, timeout=self.timeout)
+        self._remember(key, user)
+
+    def invalidate_token(self, key):
+        with self._lock:
+            self._discard(key)
+        cache.delete(token_key(key))
+
+    def invalidate_users(self, user_ids):
+        user_ids = list(user_ids)
+        with self._lock:
+            for user_id in user_ids:
+                for key in list(self._keys_by_user.get(user_id, ())):
+                    self._discard(key)
+        cache.delete_many([user_key(user_id) for user_id in user_ids])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remember(self, key, user):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (user, time.monotonic() + self.local_timeout)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[0].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[0].pk]
+
+
+token_cache = TokenUserCache(
+    max_size=TOKEN_AUTH_LRU_SIZE,
+    local_timeout=TOKEN_AUTH_LRU_TIMEOUT,
+    timeout=TOKEN_AUTH_CACHE_TIMEOUT,
+)
+
+
+def invalidate_cached_users(user_ids):
+    """
+    Drops cached users so the next request re-reads them (and re-checks is_active).
+    Call after changing user rows outside Model.save(), e.g. with QuerySet.update().
+    """
+    token_cache.invalidate_users(user_ids)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that serves token -> user from token_cache, so a warm
+    request authenticates without the authtoken_token/user join query.
+
+    Entries are dropped when the token is deleted or the user is saved
+    (including deactivation); see accounts.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            # Raises AuthenticationFailed for unknown keys and inactive users
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return (copy.copy(user), token)
+        # Views may modify request.user, so never hand out the cached instance
+        return (copy.copy(user), Token(key=key, user_id=user.pk))
+
+
+async def aauthenticate_token(request):
+    """
+    CachedTokenAuthentication for async Django views (outside DRF): returns the
+    user of a valid `Authorization: Token <key>` header, or None without one.
+    Raises AuthenticationFailed for an unknown key or inactive user.
+    """
+    result = await sync_to_async(CachedTokenAuthentication().authenticate)(request)
+    return result[0] if result else None
@@ -0,0 +1,71 @@
+# accounts/counters.py
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .models import CustomUser
+from .authentication import invalidate_cached_users
+from .graph import Follow
+
+
+def adjust_follow_counts(follower_id, followed_ids, delta):
+    """
+    Applies a follow (delta=1) or unfollow (delta=-1) of followed_ids by follower_id
+    to the denormalized counters with F() UPDATEs. Call inside the transaction
+    that changes the edges.
+    """
+    followed_ids = list(followed_ids)
+    if not followed_ids:
+        return
+    CustomUser.objects.filter(pk=follower_id).update(
+        following_count=Greatest(F('following_count') + delta * len(followed_ids), 0)
+    )
+    CustomUser.objects.filter(pk__in=followed_ids).update(
+        follower_count=Greatest(F('follower_count') + delta, 0)
+    )
+    # Authenticated requests read request.user from the token cache
+    user_ids = [follower_id, *followed_ids]
+    invalidate_cached_users(user_ids)
+    transaction.on_commit(lambda: invalidate_cached_users(user_ids))
+
+
+def _count_subquery(column):
+    # Through rows read (from_customuser=followed user, to_customuser=follower)
+    counts = (
+        Follow.objects.filter(**{column: OuterRef('pk')})
+        .order_by().values(column).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_follow_counts(batch_size=10000):
+    """
+    Recomputes follower_count and following_count from the join table in pk-range
+    batches, only rewriting users that have drifted. Returns the number of users fixed.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            CustomUser.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return fixed
+
+        drifted = (
+            CustomUser.objects.filter(pk__gte=batch[0], pk__lte=batch[-1])
+            .annotate(
+                actual_followers=_count_subquery('from_customuser'),
+                actual_following=_count_subquery('to_customuser'),
+            )
+            .filter(~Q(follower_count=F('actual_followers')) | ~Q(following_count=F('actual_following')))
+            .values_list('pk', flat=True)
+        )
+        drifted = list(drifted)
+        fixed += CustomUser.objects.filter(pk__in=drifted).update(
+            follower_count=_count_subquery('from_customuser'),
+            following_count=_count_subquery('to_customuser'),
+        )
+        invalidate_cached_users(drifted)
+        last_pk = batch[-1]
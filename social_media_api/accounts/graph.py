@@ -0,0 +1,123 @@
+# accounts/graph.py
+
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import CustomUser
+
+# Seconds a cached adjacency set lives before it is rebuilt from the join table
+GRAPH_CACHE_TIMEOUT = getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 24 * 3600)
+
+# Sets larger than this are not cached (celebrity follower lists would not fit a cache value)
+GRAPH_CACHE_MAX_IDS = getattr(settings, 'FOLLOW_GRAPH_CACHE_MAX_IDS', 100000)
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+
+Follow = CustomUser.followers.through
+
+
+class IdSet:
+    """
+    Immutable set of user IDs backed by a sorted array of 64-bit integers.
+    Membership is a binary search; serialized it is 8 bytes per ID.
+    """
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids=()):
+        self._ids = array('q', sorted(set(ids)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        id_set = cls()
+        id_set._ids.frombytes(data)
+        return id_set
+
+    def to_bytes(self):
+        return self._ids.tobytes()
+
+    def __contains__(self, user_id):
+        index = bisect_left(self._ids, user_id)
+        return index < len(self._ids) and self._ids[index] == user_id
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __repr__(self):
+        return f'IdSet({list(self._ids)!r})'
+
+
+# --- Versioned cache keys ---
+
+def version_key(kind, user_id):
+    return f'graph:{kind}:version:{user_id}'
+
+
+def get_version(kind, user_id):
+    version = cache.get(version_key(kind, user_id))
+    if version is None:
+        # Start from the clock so a lost version key never points back at old data
+        version = time.time_ns()
+        if not cache.add(version_key(kind, user_id), version, timeout=None):
+            version = cache.get(version_key(kind, user_id), version)
+    return version
+
+
+def bump_version(kind, user_id):
+    try:
+        cache.incr(version_key(kind, user_id))
+    except ValueError:
+        cache.set(version_key(kind, user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_edges(follower_ids, followed_ids):
+    """
+    Invalidates the cached sets touched by follow edges between the given users.
+    """
+    for user_id in follower_ids:
+        bump_version(FOLLOWING, user_id)
+    for user_id in followed_ids:
+        bump_version(FOLLOWERS, user_id)
+
+
+# --- Lookups ---
+
+def _load(kind, user_id):
+    # Through rows read (from_customuser=followed user, to_customuser=follower)
+    if kind == FOLLOWING:
+        rows = Follow.objects.filter(to_customuser_id=user_id).values_list('from_customuser_id', flat=True)
+    else:
+        rows = Follow.objects.filter(from_customuser_id=user_id).values_list('to_customuser_id', flat=True)
+    return IdSet(rows.iterator(chunk_size=10000))
+
+
+def get_ids(kind, user_id):
+    key = f'graph:{kind}:{user_id}:{get_version(kind, user_id)}'
+    data = cache.get(key)
+    if data is not None:
+        return IdSet.from_bytes(data)
+
+    id_set = _load(kind, user_id)
+    if len(id_set) <= GRAPH_CACHE_MAX_IDS:
+        cache.set(key, id_set.to_bytes(), timeout=GRAPH_CACHE_TIMEOUT)
+    return id_set
+
+
+def get_following_ids(user_id):
+    """IDs of the users that user_id follows."""
+    return get_ids(FOLLOWING, user_id)
+
+
+def get_follower_ids(user_id):
+    """IDs of the users that follow user_id."""
+    return get_ids(FOLLOWERS, user_id)
+
+
+def is_following(follower_id, followed_id):
+    return followed_id in get_following_ids(follower_id)
@@ -0,0 +1,128 @@
+# accounts/hashing.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from social_media_api.processes import init_django_worker
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from PASSWORD_PBKDF2_ITERATIONS.
+
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes verify as
+    before; hashes stored with a different count report must_update() and are
+    re-encoded on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+def verify_password(password, encoded):
+    """
+    Checks password against encoded in a pool worker.
+    Returns (valid, upgraded) where upgraded is a re-encoded hash when the stored
+    one uses outdated parameters, else None. A missing hash still costs one hash
+    so unknown usernames take as long as wrong passwords.
+    """
+    if encoded is None:
+        make_password(password)
+        return False, None
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, (upgraded[0] if upgraded else None)
+
+
+class HashPoolFull(Exception):
+    """Raised when the hashing pool already has max_pending jobs admitted."""
+
+
+class HashPoolTimeout(HashPoolFull):
+    """Raised when an admitted job does not finish within the pool's timeout."""
+
+
+class HashPool:
+    """
+    Runs password hashing on a local process pool so PBKDF2 uses every core
+    instead of holding request threads (and the GIL).
+
+    At most max_pending jobs are admitted at once, counting queued and running
+    ones; further callers get HashPoolFull immediately instead of queueing
+    behind a login storm. A job keeps its slot until it finishes, even when
+    the caller gave up after `timeout` seconds (HashPoolTimeout). With
+    workers=0 jobs run inline in the calling thread, still subject to
+    admission control.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=30):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending if max_pending is not None else max(self.workers, 1) * 8
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending) if self.max_pending else None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_django_worker,
+                )
+            return self._executor
+
+    def run(self, func, *args):
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            raise HashPoolFull
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self.get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Release when the worker is done, not when the caller stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashPoolTimeout from None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_pool = None
+
+
+def get_hash_pool():
+    global _pool
+    if _pool is None:
+        _pool = HashPool(
+            workers=getattr(settings, 'LOGIN_HASH_WORKERS', None),
+            max_pending=getattr(settings, 'LOGIN_HASH_MAX_PENDING', None),
+        )
+    return _pool
+
+
+@receiver(setting_changed)
+def reset_hash_pool(*, setting, **kwargs):
+    global _pool
+    if setting in ('LOGIN_HASH_WORKERS', 'LOGIN_HASH_MAX_PENDING') and _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
@@ -0,0 +1,18 @@
+# accounts/management/commands/reconcile_follow_counts.py
+
+from django.core.management.base import BaseCommand
+from accounts.counters import reconcile_follow_counts
+
+
+class Command(BaseCommand):
+    help = 'Recomputes CustomUser.follower_count and following_count from the followers join table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of users checked per UPDATE (default: 10000).'
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_follow_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled follow counts on {fixed} user(s).'))
@@ -18,5 +18,10 @@ class CustomUser(AbstractUser):
         blank=True
     )
 
+    # Denormalized counts, maintained by FollowUserView/UnfollowUserView
+    # (see reconcile_follow_counts for repairing drift)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.username
\ No newline at end of file
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from .models import CustomUser
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -27,18 +28,17 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    # Helper fields to show counts instead of lists of IDs
-    follower_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-
+    # Counts are denormalized columns on CustomUser, so no COUNT(*) per render
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'bio',
                   'profile_picture', 'follower_count', 'following_count')
         read_only_fields = ('follower_count', 'following_count')
 
-    def get_follower_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
\ No newline at end of file
+class UserIdListSerializer(serializers.Serializer):
+    # Batch follow/unfollow input: a bounded list of user IDs
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=getattr(settings, 'BULK_FOLLOW_MAX_USERS', 100),
+    )
@@ -0,0 +1,51 @@
+# accounts/signals.py
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_cached_users, token_cache
+from .graph import Follow, invalidate_edges
+from .models import CustomUser
+
+
+@receiver(m2m_changed, sender=Follow)
+def follow_edges_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidates cached follower/following sets whenever the followers M2M changes,
+    whichever side (user.followers or user.following) the change was made from.
+    """
+    if action == 'pre_clear':
+        # pk_set is not provided for clear(), so collect the affected users first
+        related = instance.following if reverse else instance.followers
+        pk_set = set(related.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        # instance.following changed: instance follows (or stopped following) pk_set
+        follower_ids, followed_ids = [instance.pk], set(pk_set)
+    else:
+        # instance.followers changed: pk_set follow (or stopped following) instance
+        follower_ids, followed_ids = set(pk_set), [instance.pk]
+
+    # Bump now for reads in this transaction, and again after commit in case a
+    # concurrent request cached the pre-commit state in between
+    invalidate_edges(follower_ids, followed_ids)
+    transaction.on_commit(lambda: invalidate_edges(follower_ids, followed_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, **kwargs):
+    """
+    Drops the cached copy of a saved user, so deactivation (is_active=False)
+    and profile edits take effect on the next authenticated request.
+    """
+    user_ids = [instance.pk]
+    invalidate_cached_users(user_ids)
+    transaction.on_commit(lambda: invalidate_cached_users(user_ids))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate_token(instance.key)
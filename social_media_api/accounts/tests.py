@@ -1,3 +1,291 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from notifications.models import Notification
+
+from .authentication import token_cache, user_key
+from .hashing import HashPool, HashPoolFull, HashPoolTimeout
+from .throttles import LoginUsernameThrottle
+from .graph import get_follower_ids, get_following_ids, is_following, IdSet
+
+User = get_user_model()
+
+
+class AccountsAPITestCase(APITestCase):
+    """
+    Base class for the accounts tests: three users and a clean cache.
+    """
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='password123')
+        self.bob = User.objects.create_user(username='bob', password='password123')
+        self.carol = User.objects.create_user(username='carol', password='password123')
+
+    def follow(self, user, target):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('user_follow', kwargs={'user_id': target.pk}))
+
+    def unfollow(self, user, target):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('user_unfollow', kwargs={'user_id': target.pk}))
+
+
+class FollowGraphCacheTests(AccountsAPITestCase):
+    """Tests the cached follower/following adjacency sets."""
+
+    def test_id_set_round_trips_and_searches(self):
+        id_set = IdSet.from_bytes(IdSet([5, 1, 3, 3]).to_bytes())
+        self.assertEqual(list(id_set), [1, 3, 5])
+        self.assertIn(3, id_set)
+        self.assertNotIn(4, id_set)
+
+    def test_sets_follow_edge_direction(self):
+        self.bob.following.add(self.alice)
+        self.assertEqual(list(get_following_ids(self.bob.pk)), [self.alice.pk])
+        self.assertEqual(list(get_follower_ids(self.alice.pk)), [self.bob.pk])
+
+    def test_cached_lookup_skips_database(self):
+        self.bob.following.add(self.alice)
+        get_following_ids(self.bob.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.bob.pk, self.alice.pk))
+
+    def test_follow_and_unfollow_invalidate_cache(self):
+        self.assertFalse(is_following(self.bob.pk, self.alice.pk))
+
+        self.assertEqual(self.follow(self.bob, self.alice).status_code, status.HTTP_200_OK)
+        self.assertTrue(is_following(self.bob.pk, self.alice.pk))
+        self.assertEqual(len(get_follower_ids(self.alice.pk)), 1)
+        self.assertEqual(self.follow(self.bob, self.alice).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.unfollow(self.bob, self.alice).status_code, status.HTTP_200_OK)
+        self.assertFalse(is_following(self.bob.pk, self.alice.pk))
+        self.assertEqual(len(get_follower_ids(self.alice.pk)), 0)
+
+    def test_clear_invalidates_both_sides(self):
+        self.alice.followers.add(self.bob, self.carol)
+        self.assertTrue(is_following(self.carol.pk, self.alice.pk))
+        self.alice.followers.clear()
+        self.assertFalse(is_following(self.carol.pk, self.alice.pk))
+
+
+class FollowCountTests(AccountsAPITestCase):
+    """Tests the denormalized follower_count/following_count columns."""
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.follower_count, user.following_count
+
+    def test_follow_and_unfollow_maintain_counts(self):
+        self.follow(self.bob, self.alice)
+        self.follow(self.carol, self.alice)
+        self.assertEqual(self.counts(self.alice), (2, 0))
+        self.assertEqual(self.counts(self.bob), (0, 1))
+
+        self.unfollow(self.bob, self.alice)
+        self.assertEqual(self.counts(self.alice), (1, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_profile_reads_counts_without_join_queries(self):
+        self.follow(self.bob, self.alice)
+        self.client.force_authenticate(user=User.objects.get(pk=self.alice.pk))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('user_profile'))
+        self.assertEqual(response.data['follower_count'], 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        self.alice.followers.add(self.bob, self.carol)
+        User.objects.filter(pk=self.bob.pk).update(follower_count=9)
+
+        call_command('reconcile_follow_counts', stdout=StringIO())
+        self.assertEqual(self.counts(self.alice), (2, 0))
+        self.assertEqual(self.counts(self.bob), (0, 1))
+
+
+@override_settings(TASKS={'BACKEND': 'notifications.queue.ImmediateBackend'})
+class BulkFollowTests(AccountsAPITestCase):
+    """Tests the batch follow/unfollow endpoints and the follow-status lookup."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.alice)
+
+    def test_bulk_follow_skips_self_unknown_and_existing(self):
+        self.follow(self.alice, self.carol)
+        response = self.client.post(reverse('user_follow_bulk'), {
+            'user_ids': [self.bob.pk, self.carol.pk, self.alice.pk, 99999]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followed'], [self.bob.pk])
+        self.assertEqual(response.data['skipped'], sorted([self.carol.pk, self.alice.pk, 99999]))
+        self.assertTrue(is_following(self.alice.pk, self.bob.pk))
+        self.assertEqual(len(get_follower_ids(self.bob.pk)), 1)
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.follower_count), (2, 1))
+        self.assertTrue(Notification.objects.filter(recipient=self.bob, verb='followed').exists())
+
+    def test_bulk_unfollow(self):
+        self.client.post(reverse('user_follow_bulk'), {'user_ids': [self.bob.pk, self.carol.pk]}, format='json')
+        response = self.client.post(reverse('user_unfollow_bulk'), {
+            'user_ids': [self.bob.pk, self.carol.pk, 99999]
+        }, format='json')
+
+        self.assertEqual(response.data['unfollowed'], sorted([self.bob.pk, self.carol.pk]))
+        self.assertEqual(response.data['skipped'], [99999])
+        self.assertEqual(len(get_following_ids(self.alice.pk)), 0)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 0)
+
+    def test_bulk_follow_validates_input(self):
+        response = self.client.post(reverse('user_follow_bulk'), {'user_ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('user_follow_bulk'), {'user_ids': list(range(1, 200))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follow_status_reads_cached_set(self):
+        self.alice.following.add(self.bob)
+        get_following_ids(self.alice.pk)
+        url = reverse('user_follow_status') + f'?ids={self.bob.pk},{self.carol.pk}'
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['following'], {self.bob.pk: True, self.carol.pk: False})
+
+        response = self.client.get(reverse('user_follow_status') + '?ids=a,b')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CachedTokenAuthenticationTests(AccountsAPITestCase):
+    """Tests that token authentication is served from the token cache and invalidated."""
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.alice)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('user_follow_status') + f'?ids={self.bob.pk}'
+
+    def test_warm_request_skips_token_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get(self.url)
+        token_cache.clear()  # as seen from a process with a cold LRU
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_holds_no_password_hash(self):
+        self.client.get(self.url)
+        cached = cache.get(user_key(self.alice.pk))
+        self.assertNotIn('password', cached.__dict__)
+        self.assertNotIn('email', cached.__dict__)
+        with self.assertNumQueries(0):
+            self.assertEqual(token_cache.get(self.token.key).username, 'alice')
+
+    def test_profile_update_from_cached_user_keeps_password(self):
+        self.alice.set_password('password123')
+        self.alice.save()
+        self.client.get(self.url)
+        response = self.client.patch(reverse('user_profile'), {'bio': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.alice.email)
+        self.alice.refresh_from_db()
+        self.assertTrue(self.alice.check_password('password123'))
+
+    def test_profile_sees_fresh_counts_after_follow(self):
+        self.client.get(reverse('user_profile'))
+        self.client.post(reverse('user_follow', kwargs={'user_id': self.bob.pk}))
+        response = self.client.get(reverse('user_profile'))
+        self.assertEqual(response.data['following_count'], 1)
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000, LOGIN_HASH_WORKERS=0)
+class LoginHashingTests(AccountsAPITestCase):
+    """Tests the pooled login hashing path: admission control, throttling and hash upgrades."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice.set_password('password123')
+        self.alice.save()
+
+    def login(self, username='alice', password='password123'):
+        return self.client.post(reverse('user_login'), {'username': username, 'password': password})
+
+    def test_login_returns_token(self):
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.alice).key)
+
+    def test_bad_credentials_are_rejected(self):
+        self.assertEqual(self.login(password='wrong').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login(username='nobody').status_code, status.HTTP_400_BAD_REQUEST)
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_upgrades_hash_to_configured_iterations(self):
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.alice.refresh_from_db()
+        self.assertTrue(self.alice.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.alice.check_password('password123'))
+
+    def test_saturated_pool_returns_503(self):
+        with self.settings(LOGIN_HASH_MAX_PENDING=0):
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_timed_out_hash_returns_503(self):
+        with patch.object(HashPool, 'run', side_effect=HashPoolTimeout):
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_timed_out_job_keeps_its_slot_until_done(self):
+        pool = HashPool(workers=1, max_pending=1, timeout=0.01)
+        done = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor, patch.object(pool, 'get_executor', return_value=executor):
+            with self.assertRaises(HashPoolTimeout):
+                pool.run(done.wait)
+            with self.assertRaises(HashPoolFull):
+                pool.run(int)
+            done.set()
+            executor.submit(int).result()  # The blocked job has finished
+            self.assertEqual(pool.run(int, '7'), 7)
+
+    def test_attempts_are_throttled_per_username(self):
+        with patch.object(LoginUsernameThrottle, 'THROTTLE_RATES', {'login_username': '2/min'}):
+            self.login(password='wrong')
+            self.login(password='wrong')
+            self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.login(username='bob').status_code, status.HTTP_200_OK)
+
+    def test_process_pool_verifies_password(self):
+        with self.settings(LOGIN_HASH_WORKERS=1):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
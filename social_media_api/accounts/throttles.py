@@ -0,0 +1,17 @@
+# accounts/throttles.py
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginUsernameThrottle(SimpleRateThrottle):
+    """
+    Limits login attempts per target username (rate: DEFAULT_THROTTLE_RATES['login_username']),
+    whichever client they come from, so one account cannot soak up the hashing pool.
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': username.lower()}
@@ -1,7 +1,10 @@
 # accounts/urls.py
 
 from django.urls import path
-from .views import UserRegistrationView, UserLoginView, UserProfileView
+from .views import (
+    UserRegistrationView, UserLoginView, UserProfileView, FollowUserView, UnfollowUserView,
+    BulkFollowUserView, BulkUnfollowUserView, FollowStatusView
+)
 
 urlpatterns = [
     # /register/ - User registration
@@ -14,4 +17,9 @@ urlpatterns = [
     path('profile/', UserProfileView.as_view(), name='user_profile'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='user_follow'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='user_unfollow'),
+
+    # Batch follow/unfollow ({"user_ids": [...]}) and follow-state lookup (?ids=1,2,3)
+    path('follow/bulk/', BulkFollowUserView.as_view(), name='user_follow_bulk'),
+    path('unfollow/bulk/', BulkUnfollowUserView.as_view(), name='user_unfollow_bulk'),
+    path('following/status/', FollowStatusView.as_view(), name='user_follow_status'),
 ]
\ No newline at end of file
@@ -4,14 +4,24 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token # <-- HERE IS WHERE TOKEN IS IMPORTED
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth import authenticate
-from .serializers import UserRegistrationSerializer, UserProfileSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.contrib.auth.signals import user_login_failed
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from notifications.tasks import notify_user_followed, create_notifications_async
+from social_media_api.querybudget import QueryBudgetMixin
+from posts.feed import backfill_feed, backfill_feed_many, purge_feed, purge_feed_many, refill_returning_authors
+from .serializers import UserRegistrationSerializer, UserProfileSerializer, UserIdListSerializer
 from .models import CustomUser
+from .graph import Follow, get_following_ids, invalidate_edges, is_following
+from .counters import adjust_follow_counts
+from .hashing import HashPoolFull, get_hash_pool, verify_password
+from .throttles import LoginUsernameThrottle
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer
+    permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -31,14 +41,35 @@ class UserRegistrationView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 class UserLoginView(APIView):
+    permission_classes = [AllowAny]
+    # Per-username limit on top of any global throttles
+    throttle_classes = [LoginUsernameThrottle]
+
     def post(self, request, *args, **kwargs):
         username = request.data.get("username")
         password = request.data.get("password")
+        if not username or not password:
+            return Response({"error": "Invalid Credentials"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = CustomUser._default_manager.filter(username=username).first()
+
+        # Hash on the process pool; refuse fast instead of queueing when it is saturated
+        # (HashPoolTimeout, a job that outlived the pool timeout, is answered the same way)
+        try:
+            valid, upgraded = get_hash_pool().run(verify_password, password, user and user.password)
+        except HashPoolFull:
+            return Response(
+                {"error": "Too many logins in progress, please retry."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
 
-        # Authenticate user using Django's built-in system
-        user = authenticate(request, username=username, password=password)
+        if user is not None and valid and user.is_active:
+            if upgraded:
+                # Stored hash used outdated parameters (e.g. PASSWORD_PBKDF2_ITERATIONS changed)
+                user.password = upgraded
+                user.save(update_fields=['password'])
 
-        if user is not None:
             # Token retrieval is handled in the View
             token, created = Token.objects.get_or_create(user=user) # <-- HERE IS WHERE TOKEN IS RETRIEVED
 
@@ -49,6 +80,7 @@ class UserLoginView(APIView):
                 "message": "Login successful"
             }, status=status.HTTP_200_OK)
         else:
+            user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
             return Response({"error": "Invalid Credentials"}, status=status.HTTP_400_BAD_REQUEST)
 
 # UserProfileView remains the same
@@ -67,7 +99,7 @@ class FollowUserView(APIView):
         # The user to be followed
         user_to_follow = get_object_or_404(CustomUser, pk=user_id)
         
-        # The authenticated user performing the action Post.objects.filter(author__in=following_users).order_by", "permissions.IsAuthenticated"
+        # The authenticated user performing the action
         current_user = request.user
 
         if current_user == user_to_follow:
@@ -77,16 +109,25 @@ class FollowUserView(APIView):
             )
         
         # Check if the user is already following
-        if current_user.following.filter(pk=user_to_follow.pk).exists():
+        if is_following(current_user.pk, user_to_follow.pk):
             return Response(
                 {"detail": f"You are already following {user_to_follow.username}."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Add the relationship:Post.objects.filter(author__in=following_users).order_by", "permissions.IsAuthenticated" generics.GenericAPIView, permissions.IsAuthenticated current_user follows user_to_follow
-        # 'following' is the reverse relationship manager of the 'followers' M2M field
-        current_user.following.add(user_to_follow)
-        
+        # Add the relationship: current_user follows user_to_follow
+        # 'following' is the reverse relationship manager of the 'followers' M2M field.
+        # The denormalized counts change in the same transaction as the edge.
+        with transaction.atomic():
+            current_user.following.add(user_to_follow)
+            adjust_follow_counts(current_user.pk, [user_to_follow.pk], 1)
+
+        # Pull the followed user's recent posts into the materialized feed
+        backfill_feed(follower=current_user, followee=user_to_follow)
+
+        # Generate Notification
+        notify_user_followed(follower=current_user, followed=user_to_follow)
+
         return Response(
             {"detail": f"Successfully followed {user_to_follow.username}."},
             status=status.HTTP_200_OK
@@ -108,121 +149,120 @@ class UnfollowUserView(APIView):
             )
 
         # Check if the user is actually following
-        if not current_user.following.filter(pk=user_to_unfollow.pk).exists():
+        if not is_following(current_user.pk, user_to_unfollow.pk):
              return Response(
                 {"detail": f"You are not following {user_to_unfollow.username}."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Remove the relationship
-        current_user.following.remove(user_to_unfollow)
+        # Remove the relationship (and update the counts in the same transaction)
+        with transaction.atomic():
+            current_user.following.remove(user_to_unfollow)
+            adjust_follow_counts(current_user.pk, [user_to_unfollow.pk], -1)
+
+        # Drop the unfollowed user's posts from the materialized feed
+        purge_feed(follower=current_user, followee=user_to_unfollow)
+        # Authors dropping back to fan-out-on-write need their pulled posts stored
+        refill_returning_authors([user_to_unfollow.pk])
 
         return Response(
             {"detail": f"Successfully unfollowed {user_to_unfollow.username}."},
             status=status.HTTP_200_OK
         )
-    
-    # posts/views.py
-
-from rest_framework import viewsets
-from rest_framework.generics import ListAPIView # <--- Needed for UserFeedView
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated # <--- IsAuthenticated is needed for the Feed
-from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
-from .models import Post, Comment
-from .serializers import PostSerializer, CommentSerializer
-from .permissions import IsAuthorOrReadOnly
-
-# --- Custom Pagination ---
-
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-# --- Post ViewSet ---
-class PostViewSet(viewsets.ModelViewSet):
-    # ... (content remains the same) ...
-    queryset = Post.objects.all()
-    serializer_class = PostSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    pagination_class = StandardResultsPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    filterset_fields = ['author__username', 'created_at']
-    search_fields = ['title', 'content']
-    
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
-
-# --- Comment ViewSet ---
-class CommentViewSet(viewsets.ModelViewSet):
-    # ... (content remains the same) ...
-    queryset = Comment.objects.all()
-    serializer_class = CommentSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    
-    def perform_create(self, serializer):
-        post_pk = self.kwargs.get('post_pk')
-        post = Post.objects.get(pk=post_pk)
-        serializer.save(author=self.request.user, post=post)
-
-    def get_queryset(self):
-        post_pk = self.kwargs.get('post_pk')
-        if post_pk:
-            return self.queryset.filter(post__pk=post_pk)
-        return self.queryset
-
-# --- User Feed View ---
-class UserFeedView(ListAPIView):
+
+# --- Batch follow endpoints ---
+
+def invalidate_after_commit(follower_ids, followed_ids):
+    # bulk_create/delete on the through table bypass m2m_changed, so invalidate here
+    invalidate_edges(follower_ids, followed_ids)
+    transaction.on_commit(lambda: invalidate_edges(follower_ids, followed_ids))
+
+
+class BulkFollowUserView(APIView):
     """
-    Returns a list of posts from all users that the current user is following,
-    ordered by creation date (newest first).
+    Follows up to BULK_FOLLOW_MAX_USERS users in one request.
+    Unknown IDs, the current user and users already followed are skipped.
     """
-    serializer_class = PostSerializer
-    # CORRECT: Permissions are mandatory for a private feed
-    permission_classes = [IsAuthenticated] 
-    pagination_class = StandardResultsPagination
+    permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        user = self.request.user
-        
-        # 1. Get the list of followed users
-        following_users = user.following.all()
-        
-        # 2. Filter, optimize, and order the posts
-        # CORRECT: Using .filter(author__in=...) and .order_by('-created_at')
-        queryset = Post.objects.filter(
-            author__in=following_users
-        ).select_related('author').order_by('-created_at')
-        
-        return 
+    def post(self, request):
+        serializer = UserIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        current_user = request.user
 
-# accounts/views.py (Modify FollowUserView)
+        requested = set(serializer.validated_data['user_ids']) - {current_user.pk}
+        targets = CustomUser.objects.in_bulk(requested)
+        following = get_following_ids(current_user.pk)
+        new_ids = sorted(pk for pk in targets if pk not in following)
 
-from notifications.tasks import notify_user_followed # <--- ADD IMPORT
+        # One INSERT for all edges, counters in the same transaction
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                [Follow(from_customuser_id=pk, to_customuser_id=current_user.pk) for pk in new_ids],
+                ignore_conflicts=True,
+            )
+            adjust_follow_counts(current_user.pk, new_ids, 1)
+            invalidate_after_commit([current_user.pk], new_ids)
 
-# ... Existing FollowUserView class ...
+        backfill_feed_many(current_user, new_ids)
+        create_notifications_async([
+            (targets[pk], current_user, 'followed', current_user) for pk in new_ids
+        ])
 
-class FollowUserView(APIView):
+        return Response(
+            {"followed": new_ids, "skipped": sorted(set(serializer.validated_data['user_ids']) - set(new_ids))},
+            status=status.HTTP_200_OK
+        )
+
+
+class BulkUnfollowUserView(APIView):
+    """
+    Unfollows up to BULK_FOLLOW_MAX_USERS users in one request.
+    IDs the current user does not follow are skipped.
+    """
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, user_id):
-        # ... (Existing follow logic and checks) ...
-        user_to_follow = get_object_or_404(CustomUser, pk=user_id)
+    def post(self, request):
+        serializer = UserIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         current_user = request.user
-        
-        # ... (Existing checks for self-follow and already following) ...
 
-        # Add the relationship: current_user follows user_to_follow
-        current_user.following.add(user_to_follow)
-        
-        # New: Generate Notification
-        notify_user_followed(follower=current_user, followed=user_to_follow)
+        following = get_following_ids(current_user.pk)
+        removed_ids = sorted(pk for pk in set(serializer.validated_data['user_ids']) if pk in following)
+
+        with transaction.atomic():
+            Follow.objects.filter(
+                to_customuser_id=current_user.pk, from_customuser_id__in=removed_ids
+            ).delete()
+            adjust_follow_counts(current_user.pk, removed_ids, -1)
+            invalidate_after_commit([current_user.pk], removed_ids)
+
+        purge_feed_many(current_user, removed_ids)
+        refill_returning_authors(removed_ids)
 
         return Response(
-            {"detail": f"Successfully followed {user_to_follow.username}."},
+            {"unfollowed": removed_ids, "skipped": sorted(set(serializer.validated_data['user_ids']) - set(removed_ids))},
             status=status.HTTP_200_OK
         )
 
-# UnfollowUserView remains the same (no notification needed for unfollow)
\ No newline at end of file
+
+class FollowStatusView(QueryBudgetMixin, APIView):
+    """
+    Answers "am I following these users?" for ?ids=1,2,3 from the cached
+    following set (at most one query on a cache miss).
+    """
+    permission_classes = [IsAuthenticated]
+    # Token lookup + following set
+    query_budget = 2
+
+    def get(self, request):
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            return Response({"detail": "ids must be a comma-separated list of integers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > UserIdListSerializer().fields['user_ids'].max_length:
+            return Response({"detail": "Too many ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        following = get_following_ids(request.user.pk)
+        return Response({"following": {pk: pk in following for pk in ids}}, status=status.HTTP_200_OK)
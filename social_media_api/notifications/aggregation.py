@@ -0,0 +1,113 @@
+# notifications/aggregation.py
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification
+from .counters import increment_unread
+from .markers import get_read_markers
+from .pubsub import publish_notifications
+
+# Actions on the same target are folded into the open notification if its
+# latest action happened less than this many seconds ago
+COALESCE_WINDOW = getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 3600)
+
+# Number of most recent actors kept on an aggregated notification
+RECENT_ACTORS = getattr(settings, 'NOTIFICATION_RECENT_ACTORS', 5)
+
+
+def group_key(event):
+    return (event['recipient_id'], event['verb'], event['content_type_id'], event['object_id'])
+
+
+def merge_actors(new_actor_ids, sample):
+    """
+    Puts new actors (oldest first) in front of the sample, most recent first.
+    Returns the new sample and how many actors were not already in it.
+    """
+    merged = list(sample)
+    added = 0
+    for actor_id in new_actor_ids:
+        if actor_id in merged:
+            merged.remove(actor_id)
+        else:
+            added += 1
+        merged.insert(0, actor_id)
+    return merged[:RECENT_ACTORS], added
+
+
+def coalesce_notifications(events):
+    """
+    Writes a batch of notification events, folding them by
+    (recipient, verb, content_type, object_id).
+
+    Events for a key that still has an unread notification inside the window
+    update that row (actor count, recent actors, timestamp); the rest are
+    inserted with one bulk_create. An actor already in the recent sample is
+    not counted twice. Returns the list of newly created rows.
+    """
+    grouped = {}
+    for event in events:
+        grouped.setdefault(group_key(event), []).append(event['actor_id'])
+
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = Notification.objects.select_for_update().filter(
+            recipient_id__in={key[0] for key in grouped},
+            verb__in={key[1] for key in grouped},
+            object_id__in={key[3] for key in grouped},
+            is_read=False,
+            timestamp__gte=now - timedelta(seconds=COALESCE_WINDOW),
+        ).order_by('timestamp')
+
+        # Rows at or below a recipient's "read up to" watermark count as read
+        markers = get_read_markers({key[0] for key in grouped})
+
+        # Later rows overwrite earlier ones, so each key maps to its newest open row
+        open_rows = {}
+        for row in candidates:
+            key = (row.recipient_id, row.verb, row.content_type_id, row.object_id)
+            read_up_to = markers.get(row.recipient_id)
+            if key in grouped and (read_up_to is None or row.timestamp > read_up_to):
+                open_rows[key] = row
+
+        updated, created = [], []
+        for key, actor_ids in grouped.items():
+            row = open_rows.get(key)
+            if row is not None:
+                sample, added = merge_actors(actor_ids, row.recent_actor_ids or [row.actor_id])
+                row.recent_actor_ids = sample
+                row.actor_count += added
+                row.actor_id = actor_ids[-1]
+                row.timestamp = now
+                updated.append(row)
+            else:
+                sample, added = merge_actors(actor_ids, [])
+                recipient_id, verb, content_type_id, object_id = key
+                created.append(Notification(
+                    recipient_id=recipient_id,
+                    actor_id=actor_ids[-1],
+                    verb=verb,
+                    content_type_id=content_type_id,
+                    object_id=object_id,
+                    actor_count=added,
+                    recent_actor_ids=sample,
+                ))
+
+        Notification.objects.bulk_update(
+            updated, ['recent_actor_ids', 'actor_count', 'actor', 'timestamp']
+        )
+        Notification.objects.bulk_create(created)
+
+    # Only new rows add to the unread badge; folded rows were already unread
+    new_per_recipient = Counter(row.recipient_id for row in created)
+    for recipient_id, count in new_per_recipient.items():
+        increment_unread(recipient_id, count)
+
+    # Push new and updated rows to any open notification streams
+    publish_notifications(created + updated)
+
+    return created
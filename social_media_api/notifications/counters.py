@@ -0,0 +1,42 @@
+# notifications/counters.py
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Notification
+from .markers import get_read_up_to, unread_filter
+
+# A count cached from a read that raced a write can be off; the timeout bounds how long
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300)
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def get_unread_count(user_id):
+    """
+    Returns the user's unread notification count from the cache.
+    On a miss the count is rebuilt from the database once and cached.
+    """
+    count = cache.get(unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(unread_filter(get_read_up_to(user_id)), recipient_id=user_id).count()
+        cache.add(unread_key(user_id), count, timeout=UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def increment_unread(user_id, delta=1):
+    """
+    Adds delta to a cached counter. A missing key is left missing: the next
+    read rebuilds it from the database, which already includes the change.
+    """
+    try:
+        if cache.incr(unread_key(user_id), delta) < 0:
+            cache.delete(unread_key(user_id))
+    except ValueError:
+        pass
+
+
+def invalidate_unread(user_id):
+    # The next read rebuilds the counter from the database
+    cache.delete(unread_key(user_id))
@@ -0,0 +1,27 @@
+# notifications/management/commands/archive_notifications.py
+
+from django.core.management.base import BaseCommand
+from notifications.retention import RETENTION_DAYS, archivable, archive_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves read notifications older than --days into the archive table in batches. '
+        'Meant to run periodically (e.g. nightly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RETENTION_DAYS,
+                            help=f'Archive read notifications older than this many days (default: {RETENTION_DAYS}).')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows moved per transaction (default: 5000).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many notifications would be archived.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable(options['days']).count()
+            self.stdout.write(f'{count} notification(s) would be archived.')
+            return
+        moved = archive_notifications(options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} notification(s).'))
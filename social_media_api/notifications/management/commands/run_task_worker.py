@@ -0,0 +1,69 @@
+# notifications/management/commands/run_task_worker.py
+
+import multiprocessing
+import os
+import socket
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from notifications.queue import claim_tasks, run_claimed
+
+
+def work(worker_id, batch_size, sleep, stale_after, once=False):
+    """
+    Claims and runs batches of queued tasks until stopped (or the queue is empty with once=True).
+    """
+    while True:
+        tasks = claim_tasks(worker_id, batch_size=batch_size, stale_after=stale_after)
+        if tasks:
+            run_claimed(tasks)
+        elif once:
+            return
+        else:
+            time.sleep(sleep)
+
+
+def _spawned_worker(index, batch_size, sleep, stale_after):
+    django.setup()
+    work(f'{socket.gethostname()}:{os.getpid()}:{index}', batch_size, sleep, stale_after)
+
+
+class Command(BaseCommand):
+    help = 'Runs worker processes for tasks stored by notifications.queue.DatabaseBackend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of worker processes to start (default: 1).')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Maximum tasks claimed per poll (default: 100).')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty (default: 1.0).')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Seconds before a running task from a dead worker is retried (default: 300).')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit instead of polling.')
+
+    def handle(self, *args, **options):
+        batch_size, sleep, stale_after = options['batch_size'], options['sleep'], options['stale_after']
+
+        if options['once'] or options['processes'] <= 1:
+            worker_id = f'{socket.gethostname()}:{os.getpid()}'
+            self.stdout.write(f'Task worker {worker_id} started.')
+            work(worker_id, batch_size, sleep, stale_after, once=options['once'])
+            return
+
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=_spawned_worker, args=(index, batch_size, sleep, stale_after))
+            for index in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} task worker process(es).')
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,66 @@
+# notifications/markers.py
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from .models import NotificationReadMarker
+
+# Cached value for users without a marker (None can't be told apart from a miss)
+NO_MARKER = 0
+
+
+def marker_key(user_id):
+    return f'notifications:read-up-to:{user_id}'
+
+
+def get_read_markers(user_ids):
+    """
+    Returns {user_id: read_up_to} for the users that have a watermark, from the
+    cache with one query for all misses.
+    """
+    keys = {marker_key(user_id): user_id for user_id in user_ids}
+    found = cache.get_many(keys)
+    markers = {keys[key]: value for key, value in found.items() if value != NO_MARKER}
+
+    missing = [user_id for key, user_id in keys.items() if key not in found]
+    if missing:
+        loaded = dict(
+            NotificationReadMarker.objects.filter(user_id__in=missing).values_list('user_id', 'read_up_to')
+        )
+        cache.set_many(
+            {marker_key(user_id): loaded.get(user_id, NO_MARKER) for user_id in missing}, timeout=None
+        )
+        markers.update(loaded)
+    return markers
+
+
+def get_read_up_to(user_id):
+    return get_read_markers([user_id]).get(user_id)
+
+
+def advance_read_marker(user_id, read_up_to):
+    """
+    Moves the user's watermark forward to read_up_to (never backwards).
+    Returns the effective watermark.
+    """
+    with transaction.atomic():
+        updated = NotificationReadMarker.objects.filter(
+            user_id=user_id, read_up_to__lt=read_up_to
+        ).update(read_up_to=read_up_to)
+        if not updated:
+            marker, _ = NotificationReadMarker.objects.get_or_create(
+                user_id=user_id, defaults={'read_up_to': read_up_to}
+            )
+            read_up_to = marker.read_up_to
+        # Drop the cached value now and after commit, so no reader caches the old one
+        cache.delete(marker_key(user_id))
+        transaction.on_commit(lambda: cache.delete(marker_key(user_id)))
+    return read_up_to
+
+
+def unread_filter(read_up_to):
+    """Q matching the notifications that are still unread under a watermark."""
+    condition = Q(is_read=False)
+    if read_up_to is not None:
+        condition &= Q(timestamp__gt=read_up_to)
+    return condition
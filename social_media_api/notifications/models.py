@@ -1,10 +1,39 @@
 # notifications/models.py
 
+from django.apps import apps
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.prefetch import GenericPrefetch
 from django.contrib.contenttypes.models import ContentType
 
+# Fields shown in a notification's target summary, per target model label.
+# with_targets() loads only these columns; other target models load in full.
+TARGET_SUMMARY_FIELDS = {
+    'posts.post': ('title',),
+    settings.AUTH_USER_MODEL.lower(): ('username',),
+}
+
+class NotificationQuerySet(models.QuerySet):
+    def for_recipient(self, user):
+        return self.filter(recipient=user)
+
+    def with_related(self):
+        # actor.username and content_type.model are read for every serialized row
+        return self.select_related('actor', 'content_type')
+
+    def with_targets(self):
+        """
+        Batch-loads the generic `target` of each row: one query per target
+        content type present, instead of one per notification.
+        """
+        querysets = [
+            apps.get_model(label)._default_manager.only('pk', *fields)
+            for label, fields in TARGET_SUMMARY_FIELDS.items()
+        ]
+        return self.prefetch_related(GenericPrefetch('target', querysets))
+
 class Notification(models.Model):
     # The user receiving the notification
     recipient = models.ForeignKey(
@@ -27,11 +56,126 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'object_id')
     
+    # Time of the latest action folded into this notification
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    # Aggregation: repeated actions on the same target within the coalescing window
+    # are folded into one row (see notifications/aggregation.py). `actor` is the latest actor.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actor_ids = models.JSONField(default=list, blank=True)
+
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            # Notification list: recipient = X ORDER BY timestamp DESC, id DESC
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_ts_idx'),
+            # Unread-only partial indexes: badge recounts and the coalescing lookup
+            # only touch unread rows, which stay a small slice of the table
+            models.Index(
+                fields=['recipient', '-timestamp'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_recipient_idx',
+            ),
+            models.Index(
+                fields=['recipient', 'verb', 'content_type', 'object_id'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_target_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.actor.username} {self.verb} {self.target}'
+
+class QueuedTask(models.Model):
+    """
+    A unit of background work stored by notifications.queue.DatabaseBackend
+    and executed by the run_task_worker management command.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        FAILED = 'failed', 'Failed'
+
+    # Registered task name, e.g. 'notifications.tasks.create_notifications'
+    name = models.CharField(max_length=255)
+    # Keyword arguments for one call of the task (JSON-serializable)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=4)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    # Set while a worker is executing the task
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='notif_task_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+class ArchivedNotification(models.Model):
+    """
+    Read notifications moved out of the hot Notification table by the
+    archive_notifications command (see notifications/retention.py).
+    Rows keep their original primary key, so re-running a batch is harmless.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications'
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    verb = models.CharField(max_length=255)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    timestamp = models.DateTimeField()
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actor_ids = models.JSONField(default=list, blank=True)
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Per-user history lookups
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_archive_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived notification {self.pk} for user {self.recipient_id}'
+
+class NotificationReadMarker(models.Model):
+    """
+    Per-user "read up to" watermark: every notification with a timestamp at or
+    before read_up_to counts as read, whatever its is_read flag. Marking all as
+    read moves the watermark instead of rewriting rows (see notifications/markers.py).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_read_marker'
+    )
+    read_up_to = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f'{self.actor.username} {self.verb} {self.target}'
\ No newline at end of file
+        return f'User {self.user_id} has read notifications up to {self.read_up_to}'
@@ -0,0 +1,113 @@
+# notifications/pubsub.py
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    """
+    Interface for pushing notification events to connected clients.
+
+    publish() may be called from any thread (request threads, task workers);
+    subscribe() is used from the event loop serving the streaming response.
+    """
+
+    def publish(self, user_id, message):
+        raise NotImplementedError
+
+    def has_subscribers(self, user_id):
+        return True
+
+    def subscribe(self, user_id):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """
+    In-process pub/sub: one asyncio.Queue per open stream.
+
+    Only reaches streams served by the same process, so it fits a single
+    ASGI process with the thread-pool task backend, and tests. Multi-process
+    deployments need a broker backed by a shared channel (e.g. Redis pub/sub).
+    """
+
+    def __init__(self, max_queue_size=100, **options):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of (loop, queue)
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id, message):
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The stream's event loop has already shut down
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        # A client that stopped reading loses its oldest events rather than growing memory
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue_size))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+
+def publish_notifications(notifications):
+    """
+    Pushes freshly written notifications to their recipients' open streams.
+    Rows are re-read with their actor only when someone is listening.
+    """
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    broker = get_broker()
+    ids = [n.pk for n in notifications if broker.has_subscribers(n.recipient_id)]
+    if not ids:
+        return
+    for notification in Notification.objects.filter(pk__in=ids).with_related().with_targets():
+        broker.publish(notification.recipient_id, NotificationSerializer(notification).data)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        config = getattr(settings, 'NOTIFICATIONS_PUBSUB', {})
+        broker_class = import_string(config.get('BACKEND', 'notifications.pubsub.InMemoryBroker'))
+        _broker = broker_class(**config.get('OPTIONS', {}))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(*, setting, **kwargs):
+    global _broker
+    if setting == 'NOTIFICATIONS_PUBSUB':
+        _broker = None
@@ -0,0 +1,250 @@
+# notifications/queue.py
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from social_media_api.processes import init_django_worker
+
+logger = logging.getLogger(__name__)
+
+# name -> Task, filled by the @task decorator when each app's tasks.py is imported
+registry = {}
+
+
+class Task:
+    """
+    A function registered with the task layer.
+
+    Every call carries one JSON-serializable payload (a dict of keyword
+    arguments). Batched tasks receive a list of payloads in a single call,
+    so a backend that collects work can hand it over all at once.
+    """
+
+    def __init__(self, func, name, batched=False, max_retries=3):
+        self.func = func
+        self.name = name
+        self.batched = batched
+        self.max_retries = max_retries
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def run(self, payloads):
+        if self.batched:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+    def enqueue(self, **payload):
+        self.enqueue_many([payload])
+
+    def enqueue_many(self, payloads):
+        payloads = list(payloads)
+        if payloads:
+            get_backend().submit(self, payloads)
+
+
+def task(func=None, *, batched=False, max_retries=3):
+    """
+    Registers a function as a task: `@task` or `@task(batched=True)`.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = Task(func, name, batched=batched, max_retries=max_retries)
+        return registry[name]
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def execute(name, payloads, max_retries=None, retry_delay=0.5):
+    """
+    Runs a task with retries and exponential backoff, then releases the DB connection.
+    Used by the pool backends, in whichever thread or process they run on.
+    """
+    task_obj = registry[name]
+    retries = task_obj.max_retries if max_retries is None else max_retries
+    try:
+        for attempt in range(retries + 1):
+            try:
+                task_obj.run(payloads)
+                return
+            except Exception:
+                if attempt == retries:
+                    logger.exception('Task %s failed after %d attempt(s)', name, attempt + 1)
+                    raise
+                logger.warning('Task %s failed, retrying', name, exc_info=True)
+                time.sleep(retry_delay * 2 ** attempt)
+    finally:
+        close_old_connections()
+
+
+# --- Backends ---
+
+class ImmediateBackend:
+    """
+    Runs tasks inline on the caller's thread. Meant for tests and debugging.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def submit(self, task_obj, payloads):
+        task_obj.run(payloads)
+
+
+class ThreadPoolBackend:
+    """
+    Runs tasks on a local thread pool once the caller's transaction commits.
+    """
+    executor_class = ThreadPoolExecutor
+
+    def __init__(self, max_workers=4, retry_delay=0.5, **options):
+        self.max_workers = max_workers
+        self.retry_delay = retry_delay
+        self._executor = None
+
+    def get_executor(self):
+        if self._executor is None:
+            self._executor = self.executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, task_obj, payloads):
+        # Wait for commit so the worker sees the rows the request just wrote
+        transaction.on_commit(lambda: self.get_executor().submit(
+            execute, task_obj.name, payloads, retry_delay=self.retry_delay
+        ))
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class ProcessPoolBackend(ThreadPoolBackend):
+    """
+    Runs tasks on a local process pool, for CPU-heavy work that would hold the GIL.
+    Workers are spawned (not forked) so they never share the parent's DB connections.
+    """
+
+    def get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_django_worker,
+            )
+        return self._executor
+
+
+class DatabaseBackend:
+    """
+    Stores tasks in the QueuedTask table, inside the caller's transaction.
+    They are executed by `python manage.py run_task_worker`.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def submit(self, task_obj, payloads):
+        from .models import QueuedTask
+
+        QueuedTask.objects.bulk_create([
+            QueuedTask(name=task_obj.name, payload=payload, max_attempts=task_obj.max_retries + 1)
+            for payload in payloads
+        ])
+
+
+# --- Database worker ---
+
+def claim_tasks(worker_id, batch_size=100, stale_after=300):
+    """
+    Claims up to batch_size due tasks for this worker and returns them.
+    Tasks left running by a crashed worker are released after stale_after seconds.
+    """
+    from .models import QueuedTask
+
+    now = timezone.now()
+    QueuedTask.objects.filter(
+        status=QueuedTask.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=stale_after),
+    ).update(status=QueuedTask.Status.PENDING, locked_by='', locked_at=None)
+
+    due = list(
+        QueuedTask.objects.filter(status=QueuedTask.Status.PENDING, run_at__lte=now)
+        .order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    # The status condition makes the claim safe against concurrent workers
+    QueuedTask.objects.filter(pk__in=due, status=QueuedTask.Status.PENDING).update(
+        status=QueuedTask.Status.RUNNING, locked_by=worker_id, locked_at=now
+    )
+    return list(QueuedTask.objects.filter(
+        pk__in=due, status=QueuedTask.Status.RUNNING, locked_by=worker_id
+    ))
+
+
+def run_claimed(tasks, retry_delay=5):
+    """
+    Runs claimed tasks grouped by name, so batched tasks get one call per group.
+    Successful tasks are deleted; failed ones are rescheduled or marked failed.
+    """
+    from .models import QueuedTask
+
+    groups = {}
+    for queued in tasks:
+        groups.setdefault(queued.name, []).append(queued)
+
+    for name, group in groups.items():
+        try:
+            registry[name].run([queued.payload for queued in group])
+        except Exception as exc:
+            logger.exception('Task %s failed for %d queued row(s)', name, len(group))
+            for queued in group:
+                queued.attempts += 1
+                queued.last_error = repr(exc)
+                queued.locked_by, queued.locked_at = '', None
+                if queued.attempts >= queued.max_attempts:
+                    queued.status = QueuedTask.Status.FAILED
+                else:
+                    queued.status = QueuedTask.Status.PENDING
+                    queued.run_at = timezone.now() + timedelta(
+                        seconds=retry_delay * 2 ** (queued.attempts - 1)
+                    )
+            QueuedTask.objects.bulk_update(
+                group, ['attempts', 'last_error', 'locked_by', 'locked_at', 'status', 'run_at']
+            )
+        else:
+            QueuedTask.objects.filter(pk__in=[queued.pk for queued in group]).delete()
+    close_old_connections()
+
+
+# --- Backend loading ---
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = getattr(settings, 'TASKS', {})
+        backend_class = import_string(config.get('BACKEND', 'notifications.queue.ThreadPoolBackend'))
+        _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(*, setting, **kwargs):
+    global _backend
+    if setting == 'TASKS':
+        _backend = None
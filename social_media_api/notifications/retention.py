@@ -0,0 +1,51 @@
+# notifications/retention.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Notification, ArchivedNotification
+
+# Read notifications older than this many days are moved to ArchivedNotification
+RETENTION_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+
+ARCHIVED_FIELDS = (
+    'id', 'recipient_id', 'actor_id', 'verb', 'content_type_id', 'object_id',
+    'timestamp', 'actor_count', 'recent_actor_ids',
+)
+
+
+def archivable(older_than_days=RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    # Read by flag, or implicitly by the recipient's "read up to" watermark
+    read = Q(is_read=True) | Q(timestamp__lte=F('recipient__notification_read_marker__read_up_to'))
+    return Notification.objects.filter(read, timestamp__lt=cutoff)
+
+
+def archive_notifications(older_than_days=RETENTION_DAYS, batch_size=5000):
+    """
+    Moves read notifications older than the cutoff into ArchivedNotification,
+    walking the primary key in batches. Each batch is one SELECT, one
+    bulk INSERT and one DELETE in its own short transaction, so the hot table
+    is never locked for long. Unread rows are never moved, which keeps the
+    unread badge counters valid. Returns the number of rows moved.
+    """
+    eligible = archivable(older_than_days)
+    moved = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                eligible.filter(pk__gt=last_pk).order_by('pk').values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return moved
+            # ignore_conflicts: a batch copied by an interrupted earlier run is not copied twice
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+            )
+            deleted, _ = Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        moved += deleted
+        last_pk = rows[-1]['id']
@@ -1,7 +1,7 @@
 # notifications/serializers.py
 
 from rest_framework import serializers
-from .models import Notification
+from .models import Notification, TARGET_SUMMARY_FIELDS
 
 class NotificationSerializer(serializers.ModelSerializer):
     # Display the actor's username
@@ -10,11 +10,46 @@ class NotificationSerializer(serializers.ModelSerializer):
     # Display the target object type (e.g., 'Post', 'CustomUser')
     target_type = serializers.CharField(source='content_type.model', read_only=True)
     
-    # Optional: Display a summary of the target object
-    # For simplicity, we just show the actor and verb
-    
+    # Summary of the target object (e.g. a post's title); None if it was deleted.
+    # Use Notification.objects.with_targets() to load targets in batches
+    target = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
+        # Aggregated notifications: `actor` is the latest actor, actor_count the total
         fields = ['id', 'recipient', 'actor', 'actor_username', 'verb', 
-                  'target_type', 'object_id', 'timestamp', 'is_read']
-        read_only_fields = ['recipient', 'actor', 'verb', 'timestamp']
\ No newline at end of file
+                  'target_type', 'object_id', 'target', 'timestamp', 'is_read',
+                  'actor_count', 'recent_actor_ids']
+        read_only_fields = ['recipient', 'actor', 'verb', 'timestamp',
+                            'actor_count', 'recent_actor_ids']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Rows at or before the user's "read up to" watermark are read without being rewritten
+        read_up_to = self.context.get('read_up_to')
+        if read_up_to is not None and instance.timestamp <= read_up_to:
+            data['is_read'] = True
+        return data
+
+    def get_target(self, obj):
+        target = obj.target
+        if target is None:
+            return None
+        fields = TARGET_SUMMARY_FIELDS.get(target._meta.label_lower, ())
+        return {'id': target.pk, **{field: getattr(target, field) for field in fields}}
+
+
+# Maximum notification IDs accepted by one batch mark-read request
+MARK_READ_MAX_IDS = 500
+
+class MarkReadSerializer(serializers.Serializer):
+    # Either an explicit list of IDs, or a watermark: everything up to this time is read
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=MARK_READ_MAX_IDS
+    )
+    read_up_to = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and 'read_up_to' not in attrs:
+            raise serializers.ValidationError('Provide "ids" or "read_up_to".')
+        return attrs
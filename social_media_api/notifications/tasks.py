@@ -1,30 +1,56 @@
 # notifications/tasks.py
 
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification
-from accounts.models import CustomUser # Import CustomUser for follow notification
+from .aggregation import coalesce_notifications
+from .queue import task
 
-def create_notification_async(recipient, actor, verb, target):
+
+@task(batched=True)
+def create_notifications(events):
+    """
+    Background task: writes a batch of notification events, coalescing repeated
+    actions on the same target into one row (see notifications/aggregation.py).
+    Each event is a dict of recipient_id, actor_id, verb, content_type_id and object_id.
     """
-    Creates a Notification instance based on the provided action.
-    This mimics an asynchronous task or signal handler.
+    coalesce_notifications(events)
+
+
+def notification_event(recipient, actor, verb, target):
+    """
+    Builds the JSON payload for create_notifications, or None for self-notifications.
     """
     if recipient == actor:
         # Don't notify users about their own actions
-        return
+        return None
 
-    # Get the ContentType object for the target
+    # ContentType lookups are served from Django's in-process cache
     target_content_type = ContentType.objects.get_for_model(target)
-    
-    # Create the notification
-    Notification.objects.create(
-        recipient=recipient,
-        actor=actor,
-        verb=verb,
-        target=target,
-        content_type=target_content_type,
-        object_id=target.pk,
-    )
+    return {
+        'recipient_id': recipient.pk,
+        'actor_id': actor.pk,
+        'verb': verb,
+        'content_type_id': target_content_type.pk,
+        'object_id': target.pk,
+    }
+
+
+def create_notification_async(recipient, actor, verb, target):
+    """
+    Queues a Notification for the provided action on the configured task backend
+    (settings.TASKS) instead of writing it on the request thread.
+    """
+    event = notification_event(recipient, actor, verb, target)
+    if event is not None:
+        create_notifications.enqueue_many([event])
+
+
+def create_notifications_async(actions):
+    """
+    Queues notifications for many (recipient, actor, verb, target) actions as one batch.
+    """
+    events = [notification_event(*action) for action in actions]
+    create_notifications.enqueue_many([event for event in events if event is not None])
+
 
 def notify_user_followed(follower, followed):
     """
@@ -35,4 +61,4 @@ def notify_user_followed(follower, followed):
         actor=follower,
         verb='followed',
         target=follower # The target is the user who followed (actor)
-    )
\ No newline at end of file
+    )
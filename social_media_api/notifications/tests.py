@@ -1,3 +1,403 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from .markers import get_read_up_to
+from .models import ArchivedNotification, Notification, NotificationReadMarker, QueuedTask
+from .pubsub import get_broker
+from .queue import registry
+from .retention import archivable
+from .tasks import create_notification_async
+
+User = get_user_model()
+
+IMMEDIATE_TASKS = {'BACKEND': 'notifications.queue.ImmediateBackend'}
+DATABASE_TASKS = {'BACKEND': 'notifications.queue.DatabaseBackend'}
+
+
+class NotificationTestCase(APITestCase):
+    """
+    Base class for the notifications tests: one recipient and two actors.
+    """
+    def setUp(self):
+        self.recipient = User.objects.create_user(username='recipient', password='password123')
+        self.actor = User.objects.create_user(username='actor', password='password123')
+        self.other_actor = User.objects.create_user(username='other', password='password123')
+        cache.clear()
+
+
+@override_settings(TASKS=DATABASE_TASKS)
+class DatabaseQueueTests(NotificationTestCase):
+    """Tests the QueuedTask backend and the run_task_worker command."""
+
+    def test_follow_enqueues_instead_of_writing(self):
+        self.client.force_authenticate(user=self.actor)
+        self.client.post(reverse('user_follow', kwargs={'user_id': self.recipient.pk}))
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(QueuedTask.objects.count(), 1)
+
+        call_command('run_task_worker', '--once', stdout=StringIO())
+        self.assertEqual(Notification.objects.get().verb, 'followed')
+        self.assertFalse(QueuedTask.objects.exists())
+
+    def test_worker_batches_queued_notifications(self):
+        create_notification_async(self.recipient, self.actor, 'followed', self.actor)
+        create_notification_async(self.recipient, self.other_actor, 'followed', self.other_actor)
+        task_obj = registry['notifications.tasks.create_notifications']
+
+        with patch.object(task_obj, 'func', wraps=task_obj.func) as func:
+            call_command('run_task_worker', '--once', stdout=StringIO())
+        func.assert_called_once()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_failed_task_is_rescheduled_then_marked_failed(self):
+        create_notification_async(self.recipient, self.actor, 'followed', self.actor)
+        QueuedTask.objects.update(max_attempts=1, payload={'recipient_id': 0})
+
+        with self.assertLogs('notifications.queue', 'ERROR'):
+            call_command('run_task_worker', '--once', stdout=StringIO())
+        queued = QueuedTask.objects.get()
+        self.assertEqual(queued.status, QueuedTask.Status.FAILED)
+        self.assertEqual(queued.attempts, 1)
+
+
+@override_settings(TASKS=IMMEDIATE_TASKS)
+class ImmediateQueueTests(TestCase):
+    """Tests that self-notifications are never queued."""
+
+    def test_self_notification_is_skipped(self):
+        user = User.objects.create_user(username='solo', password='password123')
+        create_notification_async(user, user, 'followed', user)
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(TASKS=IMMEDIATE_TASKS)
+class NotificationAggregationTests(NotificationTestCase):
+    """Tests coalescing of repeated actions on the same target."""
+
+    def setUp(self):
+        super().setUp()
+        self.target = self.recipient
+
+    def test_actions_on_same_target_are_coalesced(self):
+        create_notification_async(self.recipient, self.actor, 'liked', self.target)
+        create_notification_async(self.recipient, self.other_actor, 'liked', self.target)
+        create_notification_async(self.recipient, self.actor, 'liked', self.target)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.actor, self.actor)
+        self.assertEqual(notification.recent_actor_ids, [self.actor.pk, self.other_actor.pk])
+
+    def test_read_or_expired_notifications_are_not_reused(self):
+        create_notification_async(self.recipient, self.actor, 'liked', self.target)
+        Notification.objects.update(is_read=True)
+        create_notification_async(self.recipient, self.other_actor, 'liked', self.target)
+
+        with patch('notifications.aggregation.COALESCE_WINDOW', 0):
+            create_notification_async(self.recipient, self.actor, 'liked', self.target)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_batch_folds_events_before_writing(self):
+        create_notifications = registry['notifications.tasks.create_notifications']
+        event = {
+            'recipient_id': self.recipient.pk, 'verb': 'liked',
+            'content_type_id': ContentType.objects.get_for_model(self.target).pk,
+            'object_id': self.target.pk,
+        }
+        create_notifications([
+            {**event, 'actor_id': self.actor.pk},
+            {**event, 'actor_id': self.other_actor.pk},
+        ])
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+
+@override_settings(TASKS=IMMEDIATE_TASKS)
+class UnreadCounterTests(NotificationTestCase):
+    """Tests the cached unread counter behind the badge endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.badge_url = reverse('notifications-unread-count')
+        self.client.force_authenticate(user=self.recipient)
+
+    def badge(self):
+        return self.client.get(self.badge_url).data['unread_count']
+
+    def test_badge_is_served_from_cache(self):
+        create_notification_async(self.recipient, self.actor, 'followed', self.actor)
+        self.assertEqual(self.badge(), 1)
+
+        create_notification_async(self.recipient, self.other_actor, 'followed', self.other_actor)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 2)
+
+    def test_mark_read_actions_update_counter(self):
+        create_notification_async(self.recipient, self.actor, 'followed', self.actor)
+        create_notification_async(self.recipient, self.other_actor, 'followed', self.other_actor)
+        self.assertEqual(self.badge(), 2)
+
+        notification = Notification.objects.filter(actor=self.actor).get()
+        self.client.patch(reverse('notifications-mark-as-read', kwargs={'pk': notification.pk}))
+        self.assertEqual(self.badge(), 1)
+
+        self.client.patch(reverse('notifications-mark-all-as-read'))
+        self.assertEqual(self.badge(), 0)
+
+    def test_mark_all_keeps_notifications_newer_than_the_marker(self):
+        # Written by another request just after the watermark moved
+        notification = Notification.objects.create(
+            recipient=self.recipient, actor=self.actor, verb='followed',
+            content_type=ContentType.objects.get_for_model(User), object_id=self.actor.pk,
+        )
+        Notification.objects.filter(pk=notification.pk).update(timestamp=timezone.now() + timedelta(minutes=1))
+        self.client.patch(reverse('notifications-mark-all-as-read'))
+        self.assertEqual(self.badge(), 1)
+
+
+class NotificationQueryTests(NotificationTestCase):
+    """Tests that a notification page costs a constant number of queries."""
+
+    def create(self, count):
+        post_type = ContentType.objects.get_for_model(Post)
+        user_type = ContentType.objects.get_for_model(User)
+        for i in range(count):
+            post = Post.objects.create(author=self.recipient, title=f'Post {i}', content='Body')
+            Notification.objects.create(recipient=self.recipient, actor=self.actor, verb='liked',
+                                        content_type=post_type, object_id=post.pk)
+        Notification.objects.create(recipient=self.recipient, actor=self.other_actor, verb='followed',
+                                    content_type=user_type, object_id=self.other_actor.pk)
+
+    def list_queries(self):
+        self.client.force_authenticate(user=self.recipient)
+        get_read_up_to(self.recipient.pk)  # Warm the cached read marker
+        # Count + page + one query per target content type (posts, users)
+        with self.assertNumQueries(4):
+            return self.client.get(reverse('notifications-list')).data['results']
+
+    def test_page_cost_does_not_grow_with_rows(self):
+        self.create(2)
+        self.assertEqual(len(self.list_queries()), 3)
+        self.create(10)
+        self.assertEqual(len(self.list_queries()), 14)
+
+    def test_target_summaries(self):
+        self.create(1)
+        results = self.list_queries()
+        self.assertEqual(results[0]['target'], {'id': self.other_actor.pk, 'username': 'other'})
+        self.assertEqual(results[0]['actor_username'], 'other')
+        self.assertEqual(results[1]['target']['title'], 'Post 0')
+        self.assertEqual(results[1]['target_type'], 'post')
+
+        Post.objects.all().delete()
+        self.assertIsNone(self.list_queries()[1]['target'])
+
+
+class ReadMarkerTests(NotificationTestCase):
+    """Tests batch mark-as-read and the "read up to" watermark."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.recipient)
+        user_type = ContentType.objects.get_for_model(User)
+        self.notifications = [
+            Notification.objects.create(recipient=self.recipient, actor=self.actor, verb='followed',
+                                        content_type=user_type, object_id=self.actor.pk)
+            for _ in range(3)
+        ]
+        for days_ago, notification in zip((3, 2, 1), self.notifications):
+            Notification.objects.filter(pk=notification.pk).update(
+                timestamp=timezone.now() - timedelta(days=days_ago)
+            )
+
+    def mark(self, **data):
+        return self.client.patch(reverse('notifications-mark-read-batch'), data, format='json')
+
+    def unread(self):
+        return self.client.get(reverse('notifications-unread-count')).data['unread_count']
+
+    def test_mark_ids_in_one_update(self):
+        others = Notification.objects.create(recipient=self.actor, actor=self.recipient, verb='followed',
+                                             content_type=ContentType.objects.get_for_model(User),
+                                             object_id=self.recipient.pk)
+        self.assertEqual(self.unread(), 3)
+        ids = [self.notifications[0].pk, self.notifications[1].pk, others.pk]
+        response = self.mark(ids=ids)
+        self.assertEqual(response.data['marked'], 2)
+        self.assertEqual(self.unread(), 1)
+        self.assertFalse(Notification.objects.get(pk=others.pk).is_read)
+
+    def test_read_up_to_watermark(self):
+        response = self.mark(read_up_to=(timezone.now() - timedelta(hours=36)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.unread(), 1)
+        # Rows stay untouched; the watermark decides what the API reports
+        self.assertFalse(Notification.objects.filter(is_read=True).exists())
+        results = self.client.get(reverse('notifications-list')).data['results']
+        self.assertEqual([n['is_read'] for n in results], [False, True, True])
+
+        # The watermark never moves backwards
+        self.mark(read_up_to=(timezone.now() - timedelta(days=10)).isoformat())
+        self.assertEqual(self.unread(), 1)
+
+    def test_mark_all_moves_watermark(self):
+        self.client.patch(reverse('notifications-mark-all-as-read'))
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(NotificationReadMarker.objects.get(user=self.recipient).user_id, self.recipient.pk)
+        # Already read under the watermark, so the counter is left alone
+        self.client.patch(reverse('notifications-mark-as-read', kwargs={'pk': self.notifications[0].pk}))
+        self.assertEqual(self.unread(), 0)
+
+    def test_requires_ids_or_watermark(self):
+        self.assertEqual(self.mark().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_watermarked_rows_are_archivable(self):
+        self.client.patch(reverse('notifications-mark-all-as-read'))
+        self.assertEqual(archivable(older_than_days=0).count(), 3)
+
+
+class AsyncNotificationListTests(NotificationTestCase):
+    """Tests that the async notification list serves the same pages as the DRF list."""
+
+    def setUp(self):
+        super().setUp()
+        post = Post.objects.create(author=self.recipient, title='Post', content='Body')
+        post_type = ContentType.objects.get_for_model(Post)
+        user_type = ContentType.objects.get_for_model(User)
+        for actor in (self.actor, self.other_actor):
+            Notification.objects.create(recipient=self.recipient, actor=actor, verb='liked',
+                                        content_type=post_type, object_id=post.pk)
+            Notification.objects.create(recipient=self.recipient, actor=actor, verb='followed',
+                                        content_type=user_type, object_id=actor.pk)
+        Notification.objects.create(recipient=self.actor, actor=self.recipient, verb='followed',
+                                    content_type=user_type, object_id=self.recipient.pk)
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.recipient).key}'}
+        get_read_up_to(self.recipient.pk)  # Warm the cached read marker
+
+    async def get_both(self, data=None):
+        response = await self.async_client.get(reverse('notification_list_async'), data, headers=self.headers)
+        expected = await sync_to_async(self.client.get)(reverse('notifications-list'), data, headers=self.headers)
+        return response.json(), expected.json()
+
+    async def test_matches_drf_list(self):
+        data, expected = await self.get_both({'count': 'true'})
+        self.assertEqual(data, expected)
+        self.assertEqual(data['count'], 4)
+        self.assertEqual({n['target_type'] for n in data['results']}, {'post', 'customuser'})
+
+    async def test_applies_read_watermark(self):
+        await sync_to_async(self.client.force_authenticate)(user=self.recipient)
+        await sync_to_async(self.client.patch)(reverse('notifications-mark-all-as-read'))
+        data, expected = await self.get_both()
+        self.assertEqual(data, expected)
+        self.assertTrue(all(n['is_read'] for n in data['results']))
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('notification_list_async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ArchiveNotificationsTests(NotificationTestCase):
+    """Tests moving old read notifications into the archive table."""
+
+    def create(self, days_ago, is_read=True):
+        notification = Notification.objects.create(
+            recipient=self.recipient, actor=self.actor, verb='followed',
+            content_type=ContentType.objects.get_for_model(User), object_id=self.actor.pk, is_read=is_read,
+        )
+        # auto_now_add ignores explicit values
+        Notification.objects.filter(pk=notification.pk).update(timestamp=timezone.now() - timedelta(days=days_ago))
+        return notification
+
+    def test_moves_only_old_read_rows_in_batches(self):
+        old = [self.create(100) for _ in range(5)]
+        unread = self.create(100, is_read=False)
+        recent = self.create(1)
+
+        out = StringIO()
+        call_command('archive_notifications', '--days', '90', '--batch-size', '2', stdout=out)
+        self.assertIn('Archived 5', out.getvalue())
+
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {unread.pk, recent.pk})
+        archived = ArchivedNotification.objects.get(pk=old[0].pk)
+        self.assertEqual((archived.recipient, archived.verb, archived.target), (self.recipient, 'followed', self.actor))
+
+    def test_dry_run_and_rerun_are_harmless(self):
+        self.create(100)
+        out = StringIO()
+        call_command('archive_notifications', '--dry-run', stdout=out)
+        self.assertIn('1 notification(s) would be archived', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
+
+        call_command('archive_notifications', stdout=StringIO())
+        call_command('archive_notifications', stdout=StringIO())
+        self.assertEqual((Notification.objects.count(), ArchivedNotification.objects.count()), (0, 1))
+
+
+@override_settings(TASKS=IMMEDIATE_TASKS)
+class NotificationStreamTests(NotificationTestCase):
+    """Tests the Server-Sent Events stream fed by the in-memory broker."""
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.recipient)
+        self.stream_url = reverse('notification_stream')
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_not_served_over_wsgi(self):
+        response = self.client.get(self.stream_url, {'token': self.token.key})
+        self.assertEqual(response.status_code, 501)
+
+    async def test_stream_pushes_new_notifications(self):
+        response = await self.async_client.get(self.stream_url, {'token': self.token.key})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = asyncio.Queue()
+
+        async def read():
+            async for chunk in response.streaming_content:
+                await chunks.put(chunk)
+
+        reader = asyncio.create_task(read())
+        self.assertEqual(await chunks.get(), b'retry: 5000\n\n')
+
+        # The subscription is open once the first chunk has been sent
+        await sync_to_async(create_notification_async)(
+            self.recipient, self.actor, 'followed', self.actor
+        )
+        event = (await chunks.get()).decode()
+
+        # A client disconnect cancels the stream, which must drop the subscription
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertFalse(get_broker().has_subscribers(self.recipient.pk))
+
+        self.assertIn('event: notification', event)
+        payload = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(payload['actor_username'], 'actor')
+
+    async def test_broker_drops_subscription_on_exit(self):
+        broker = get_broker()
+        async with broker.subscribe(self.recipient.pk) as queue:
+            broker.publish(self.recipient.pk, {'id': 1})
+            self.assertEqual(await queue.get(), {'id': 1})
+        self.assertFalse(broker.has_subscribers(self.recipient.pk))
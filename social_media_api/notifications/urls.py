@@ -2,12 +2,18 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificationViewSet
+from .views import NotificationViewSet, notification_list_async, notification_stream
 
 router = DefaultRouter()
 router.register(r'', NotificationViewSet, basename='notifications')
 
 urlpatterns = [
+    # Server-Sent Events stream of new notifications (serve via ASGI)
+    path('stream/', notification_stream, name='notification_stream'),
+
+    # Async version of the list (serve via ASGI)
+    path('async/', notification_list_async, name='notification_list_async'),
+
     # Routes for /notifications/ (list, mark-read, mark-as-read/{pk}/)
     path('', include(router.urls)), 
 ]
\ No newline at end of file
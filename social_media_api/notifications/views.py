@@ -1,17 +1,34 @@
 # notifications/views.py
 
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
+from accounts.authentication import CachedTokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from social_media_api.asyncviews import async_read_view
+from social_media_api.pagination import KeysetPagination
+from social_media_api.querybudget import QueryBudgetMixin
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
+from .counters import get_unread_count, increment_unread, invalidate_unread
+from .markers import advance_read_marker, get_read_up_to, unread_filter
+from .pubsub import get_broker
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(KeysetPagination):
+    # Keyset pagination on (timestamp, id): opaque ?cursor=, ?count=false skips the count
+    ordering = ('-timestamp', '-id')
     page_size = 20
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Allows users to view their notifications and mark them as read.
     ReadOnlyModelViewSet ensures no creation/deletion via this endpoint.
@@ -19,25 +36,156 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = NotificationPagination
+    # Token lookup + page (+ count unless ?count=false) + one target query per content type
+    # (+ the read marker on a cache miss)
+    query_budget = {'list': 6, 'retrieve': 4}
 
     def get_queryset(self):
         # Only show notifications meant for the authenticated user
-        return Notification.objects.filter(recipient=self.request.user)
+        queryset = Notification.objects.for_recipient(self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_related().with_targets()
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['read_up_to'] = get_read_up_to(self.request.user.pk)
+        return context
 
     @action(detail=False, methods=['patch'], url_path='mark-read')
     def mark_all_as_read(self, request):
         """
-        Marks all unread notifications for the current user as read.
+        Marks all notifications for the current user as read by moving their
+        "read up to" watermark to now; no notification rows are rewritten.
         """
-        self.get_queryset().filter(is_read=False).update(is_read=True)
+        advance_read_marker(request.user.pk, timezone.now())
+        # Not reset to 0: notifications written since the marker moved are still unread
+        invalidate_unread(request.user.pk)
         return Response({'detail': 'All notifications marked as read.'}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['patch'], url_path='mark-read-batch')
+    def mark_read_batch(self, request):
+        """
+        Marks many notifications as read in one request: {"ids": [...]} flags
+        the listed rows with a single UPDATE, {"read_up_to": "<datetime>"}
+        moves the watermark. Both may be combined.
+        """
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_id = request.user.pk
+        response = {}
+
+        if 'read_up_to' in serializer.validated_data:
+            # Never beyond now, or future notifications would arrive already read
+            read_up_to = min(serializer.validated_data['read_up_to'], timezone.now())
+            response['read_up_to'] = advance_read_marker(user_id, read_up_to)
+            invalidate_unread(user_id)
+
+        ids = serializer.validated_data.get('ids')
+        if ids:
+            # Rows under the watermark are already read; only flag the others
+            updated = self.get_queryset().filter(
+                unread_filter(get_read_up_to(user_id)), pk__in=ids
+            ).update(is_read=True)
+            increment_unread(user_id, -updated)
+            response['marked'] = updated
+
+        return Response(response, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['patch'])
     def mark_as_read(self, request, pk=None):
         """
         Marks a specific notification as read.
         """
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
-        return Response({'detail': 'Notification marked as read.'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        queryset = self.get_queryset().filter(pk=pk)
+        if queryset.filter(unread_filter(get_read_up_to(request.user.pk))).update(is_read=True):
+            increment_unread(request.user.pk, -1)
+        elif not queryset.exists():
+            raise Http404
+        return Response({'detail': 'Notification marked as read.'}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """
+        Returns the unread badge count from the cached per-user counter.
+        """
+        return Response({'unread_count': get_unread_count(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+# --- Async list (serve via ASGI, see social_media_api/asyncviews.py) ---
+
+@async_read_view(query_budget=6)
+async def notification_list_async(request):
+    """
+    The notification list as an async view: same pages, cursors and read state
+    as /api/notifications/, read with the async ORM.
+    """
+    queryset = Notification.objects.for_recipient(request.user).with_related().with_targets()
+    paginator = NotificationPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    read_up_to = await sync_to_async(get_read_up_to)(request.user.pk)
+    serializer = NotificationSerializer(page, many=True, context={'request': request, 'read_up_to': read_up_to})
+    return JsonResponse(paginator.get_paginated_data(serializer.data))
+
+
+# --- Server-Sent Events stream ---
+
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT = 15
+
+
+@sync_to_async
+def authenticate_stream(request):
+    """
+    Resolves the user for a stream request from the usual `Authorization: Token <key>`
+    header or, for browser EventSource clients that cannot set headers, a ?token= parameter.
+    """
+    authenticator = CachedTokenAuthentication()
+    header = request.headers.get('Authorization', '').split()
+    if len(header) == 2 and header[0] == authenticator.keyword:
+        key = header[1]
+    else:
+        key = request.GET.get('token')
+    if not key:
+        return None
+    try:
+        user, _ = authenticator.authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+def format_event(notification):
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def notification_stream(request):
+    """
+    Pushes the user's new notifications as Server-Sent Events, replacing polling.
+    Must be served by the ASGI application (social_media_api/asgi.py) to hold
+    many open streams without tying up a worker thread each.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would hold a worker thread for as long as it is open
+        return JsonResponse({'detail': 'The notification stream is only served over ASGI.'}, status=501)
+    user = await authenticate_stream(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    async def events():
+        async with get_broker().subscribe(user.pk) as queue:
+            # Ask EventSource clients to reconnect after 5 seconds if the stream drops
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    notification = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(notification)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
@@ -0,0 +1,111 @@
+# posts/caching.py
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+# Seconds a cached response body lives; a version bump makes it unreachable sooner
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'POSTS_RESPONSE_CACHE_TIMEOUT', 300)
+
+# Content scopes. The post list shows counters, so comments and likes bump it too.
+POST_LIST = 'posts'
+
+
+def comments_scope(post_id):
+    return f'comments:{post_id}'
+
+
+# --- Content versions ---
+
+def version_key(scope):
+    return f'response:version:{scope}'
+
+
+def get_versions(scopes):
+    """
+    Returns {scope: version} where a version is the time.time_ns() of the
+    scope's last change. Unknown scopes start at the current time.
+    """
+    keys = {version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, scope in keys.items():
+        if scope not in versions:
+            now = time.time_ns()
+            if not cache.add(key, now, timeout=None):
+                now = cache.get(key, now)
+            versions[scope] = now
+    return versions
+
+
+def bump_versions(*scopes):
+    now = time.time_ns()
+    cache.set_many({version_key(scope): now for scope in scopes}, timeout=None)
+
+
+def bump_versions_on_commit(*scopes):
+    # Bump now for reads in this transaction, and again after commit in case a
+    # concurrent request cached the pre-commit state in between
+    bump_versions(*scopes)
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+# --- View mixin ---
+
+class CachedListMixin:
+    """
+    Caches list() responses per URL and content version, with conditional GET.
+
+    Subclasses name the content a list depends on in get_cache_scopes(). The
+    ETag and Last-Modified headers are derived from the scope versions alone,
+    so a matching If-None-Match / If-Modified-Since gets a 304 without touching
+    the database or the serializer; otherwise the serialized data is served
+    from the cache when present. Responses must not depend on request.user.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        versions = get_versions(self.get_cache_scopes())
+        url = request.build_absolute_uri()
+        fingerprint = '|'.join([type(self).__name__, url, *(f'{s}={v}' for s, v in sorted(versions.items()))])
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        etag = quote_etag(digest)
+        last_modified = max(versions.values()) // 10**9
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'response:body:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = super().list(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(key, response.data, timeout=RESPONSE_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Clients may store the response but must revalidate it on every use
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # Weak comparison, as for GET in RFC 9110
+            tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+            return '*' in tags or etag in tags
+        # HTTP dates have one-second resolution, so ETags are the precise validator
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
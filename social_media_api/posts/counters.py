@@ -0,0 +1,53 @@
+# posts/counters.py
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .models import Post, Comment, Like
+from .caching import POST_LIST, bump_versions
+
+
+def adjust_post_counter(post_id, field, delta):
+    """
+    Atomically adds delta to one of the Post counter columns with a single UPDATE.
+    Never lets the counter go below zero.
+    """
+    Post.objects.filter(pk=post_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _count_subquery(model):
+    counts = (
+        model.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_post_counters(batch_size=10000):
+    """
+    Recomputes comment_count and like_count from the source tables in pk-range
+    batches, only rewriting rows that have drifted. Returns the number of posts fixed.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            if fixed:
+                # Cached post lists show the old counters
+                bump_versions(POST_LIST)
+            return fixed
+
+        drifted = (
+            Post.objects.filter(pk__gte=batch[0], pk__lte=batch[-1])
+            .annotate(actual_comments=_count_subquery(Comment), actual_likes=_count_subquery(Like))
+            .filter(~Q(comment_count=F('actual_comments')) | ~Q(like_count=F('actual_likes')))
+            .values_list('pk', flat=True)
+        )
+        fixed += Post.objects.filter(pk__in=list(drifted)).update(
+            comment_count=_count_subquery(Comment),
+            like_count=_count_subquery(Like),
+        )
+        last_pk = batch[-1]
@@ -0,0 +1,223 @@
+# posts/feed.py
+
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import F, Q, Subquery, Window
+from django.db.models.functions import RowNumber
+from accounts.graph import Follow, get_follower_ids, get_following_ids
+from accounts.models import CustomUser
+from .models import Post, FeedEntry
+
+# Authors with more followers than this are not fanned out on write;
+# their posts are merged into followers' feeds at read time instead.
+FANOUT_MAX_FOLLOWERS = getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)
+
+# How many recent posts are copied into a feed when a new follow happens
+BACKFILL_LIMIT = getattr(settings, 'FEED_BACKFILL_LIMIT', 50)
+
+# Newest entries kept per feed; older posts drop out of the materialized feed
+MAX_ENTRIES = getattr(settings, 'FEED_MAX_ENTRIES', 1000)
+
+# A follower's feed is trimmed on about one in this many fan-outs that reach it,
+# so feeds stay near MAX_ENTRIES without a DELETE per follower on every post
+TRIM_INTERVAL = getattr(settings, 'FEED_TRIM_INTERVAL', 50)
+
+BATCH_SIZE = 1000
+
+
+def is_fanout_author(author):
+    """
+    Returns True when the author's posts should be pushed into follower feeds on write.
+    """
+    return author.follower_count <= FANOUT_MAX_FOLLOWERS
+
+
+def fan_out_post(post):
+    """
+    Writes a FeedEntry for every follower of the post's author (fan-out-on-write).
+    Skipped for high-follower authors, which are read with fan-out-on-read.
+    """
+    author = post.author
+    if not is_fanout_author(author):
+        return
+
+    follower_ids = list(get_follower_ids(author.pk))
+    entries = [
+        FeedEntry(user_id=follower_id, post=post, created_at=post.created_at)
+        for follower_id in follower_ids
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    # Post IDs reaching a follower are spread over the residues, so each
+    # follower is trimmed about once per TRIM_INTERVAL posts it receives
+    for follower_id in follower_ids:
+        if (follower_id - post.pk) % TRIM_INTERVAL == 0:
+            trim_feed(follower_id)
+
+
+def trim_feed(user_id):
+    """
+    Deletes the user's feed entries beyond the newest MAX_ENTRIES: one range
+    delete below the oldest kept entry, found on the (user, created_at, post) index.
+    """
+    oldest_kept = (
+        FeedEntry.objects.filter(user_id=user_id).order_by('-created_at', '-post_id')
+        .values('created_at')[MAX_ENTRIES - 1:MAX_ENTRIES]
+    )
+    FeedEntry.objects.filter(user_id=user_id, created_at__lt=Subquery(oldest_kept)).delete()
+
+
+def backfill_feed(follower, followee):
+    """
+    Copies the followee's most recent posts into the follower's feed after a new follow.
+    """
+    backfill_feed_many(follower, [followee.pk])
+
+
+def backfill_feed_many(follower, followee_ids):
+    """
+    Backfills several new follows at once: the most recent posts of every
+    fanned-out followee are selected with one windowed query.
+    """
+    recent_posts = (
+        Post.objects.filter(author_id__in=followee_ids, author__follower_count__lte=FANOUT_MAX_FOLLOWERS)
+        .annotate(recency=Window(RowNumber(), partition_by=F('author_id'), order_by=F('created_at').desc()))
+        .filter(recency__lte=BACKFILL_LIMIT)
+        .values_list('pk', 'created_at')
+    )
+    entries = [
+        FeedEntry(user=follower, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent_posts
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    if entries:
+        trim_feed(follower.pk)
+
+
+def rebuild_feed(user_id):
+    """
+    Fills the user's feed with the newest MAX_ENTRIES posts of the fanned-out
+    authors they follow, for follows and posts that predate the materialized
+    feed (see the rebuild_feeds command). Safe to repeat. Returns the number
+    of posts selected.
+    """
+    # Through rows read (from_customuser=followed user, to_customuser=follower)
+    followed = Follow.objects.filter(to_customuser_id=user_id).values('from_customuser_id')
+    recent_posts = list(
+        Post.objects.filter(author_id__in=followed, author__follower_count__lte=FANOUT_MAX_FOLLOWERS)
+        .order_by('-created_at', '-id').values_list('pk', 'created_at')[:MAX_ENTRIES]
+    )
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, created_at=created_at) for post_id, created_at in recent_posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    if recent_posts:
+        trim_feed(user_id)
+    return len(recent_posts)
+
+
+def refill_author_feeds(author_id):
+    """
+    Copies the author's newest BACKFILL_LIMIT posts into every follower's
+    feed. Their posts were pulled at read time while the author was above
+    FANOUT_MAX_FOLLOWERS and stored nowhere, so without this they would drop
+    out of feeds when the author falls back to fan-out-on-write.
+    """
+    recent_posts = list(
+        Post.objects.filter(author_id=author_id).order_by('-created_at', '-id')
+        .values_list('pk', 'created_at')[:BACKFILL_LIMIT]
+    )
+    if not recent_posts:
+        return
+    # Trimming is left to later fan-outs, as in fan_out_post
+    entries = (
+        FeedEntry(user_id=follower_id, post_id=post_id, created_at=created_at)
+        for follower_id in get_follower_ids(author_id)
+        for post_id, created_at in recent_posts
+    )
+    while batch := list(islice(entries, BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def refill_returning_authors(author_ids):
+    """
+    Queues refill_author_feeds for the authors an unfollow just brought back
+    to FANOUT_MAX_FOLLOWERS. Call after the counters are updated.
+    """
+    from .tasks import refill_feeds
+
+    returning = CustomUser.objects.filter(
+        pk__in=list(author_ids), follower_count=FANOUT_MAX_FOLLOWERS,
+    ).values_list('pk', flat=True)
+    refill_feeds.enqueue_many([{'author_id': author_id} for author_id in returning])
+
+
+def purge_feed(follower, followee):
+    """
+    Removes the followee's posts from the follower's feed after an unfollow.
+    """
+    purge_feed_many(follower, [followee.pk])
+
+
+def purge_feed_many(follower, followee_ids):
+    FeedEntry.objects.filter(user=follower, post__author_id__in=followee_ids).delete()
+
+
+class Feed:
+    """
+    A user's home feed, newest first, as separate indexed ranges that
+    FeedPagination (posts/views.py) reads with the cursor applied and merges:
+
+    - the user's FeedEntry rows, on (user, created_at, post)
+    - posts of followed authors that are not fanned out, on (author, created_at, id)
+
+    Both are ordered by the post's (created_at, id), so one cursor pages both
+    and a deep page costs the same as the first.
+    """
+    model = Post
+
+    def __init__(self, user, pulled_author_ids=(), empty=False):
+        entries = FeedEntry.objects.none() if empty else FeedEntry.objects.filter(user=user)
+        self.entries = entries.select_related('post__author')
+        self.pulled_author_ids = list(pulled_author_ids)
+
+    def parts(self):
+        """(queryset, ordering, row -> Post) for each range."""
+        parts = [(self.entries, ('-created_at', '-post_id'), attrgetter('post'))]
+        if self.pulled_author_ids:
+            pulled = Post.objects.filter(author_id__in=self.pulled_author_ids).select_related('author')
+            parts.append((pulled, ('-created_at', '-id'), lambda post: post))
+        return parts
+
+    def count_queryset(self):
+        if not self.pulled_author_ids:
+            return self.entries
+        # A post can be in both parts if its author crossed the fan-out limit
+        return Post.objects.filter(
+            Q(pk__in=self.entries.values('post_id')) | Q(author_id__in=self.pulled_author_ids)
+        )
+
+    def count(self):
+        return self.count_queryset().count()
+
+    async def acount(self):
+        return await self.count_queryset().acount()
+
+
+def get_feed(user):
+    """
+    Returns the user's home feed (a Feed).
+
+    Fanned-out posts are read from the user's FeedEntry rows; posts by followed
+    high-follower authors are merged in directly from the posts table (hybrid read).
+    """
+    # Followed authors come from the cached adjacency set, not the join table
+    followed = list(get_following_ids(user.pk))
+    if not followed:
+        return Feed(user, empty=True)
+    pulled_author_ids = (
+        type(user).objects.filter(pk__in=followed, follower_count__gt=FANOUT_MAX_FOLLOWERS)
+        .values_list('id', flat=True)
+    )
+    return Feed(user, pulled_author_ids)
@@ -0,0 +1,231 @@
+# posts/likes.py
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import IntegrityError, close_old_connections, transaction
+from notifications.tasks import create_notifications_async
+from .models import Post, Like
+from .counters import adjust_post_counter
+from .caching import POST_LIST, bump_versions_on_commit
+from .trending import trending
+
+logger = logging.getLogger(__name__)
+
+class LikeBuffer:
+    """
+    Write-behind buffer for like/unlike toggles.
+
+    Toggles are recorded in memory as the desired final state per (post, user)
+    and written in batches: one SELECT for the rows that already exist, one
+    bulk_create for new likes, one DELETE for removed likes, and one counter
+    UPDATE per touched post. Repeated taps on the same post between flushes
+    collapse into a single write.
+
+    If another process inserts one of the pairs between the SELECT and the
+    insert, the unique constraint fails the batch, which is rolled back and
+    written again against a fresh SELECT, so like_count and notifications
+    only cover rows this flush inserted. Likes whose post or user was
+    deleted before the flush are dropped.
+
+    Requests flush stale toggles as they come in; a background thread
+    flushes them when requests stop, so a toggle waits about flush_interval
+    seconds at most.
+    """
+    write_attempts = 3
+
+    def __init__(self, max_pending=500, flush_interval=2.0, background_flush=True):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.background_flush = background_flush
+        self._lock = threading.Lock()
+        self._pending = {}  # (post_id, user_id) -> desired liked state
+        self._oldest = None
+        self._wakeup = threading.Event()
+        self._flusher = None
+
+    def is_liked(self, post_id, user_id):
+        """
+        Returns the user's current like state, including unflushed toggles.
+        """
+        with self._lock:
+            state = self._pending.get((post_id, user_id))
+        if state is not None:
+            return state
+        return Like.objects.filter(post_id=post_id, user_id=user_id).exists()
+
+    def toggle(self, post_id, user_id):
+        """
+        Flips the like state for (post, user) and returns the new state.
+        """
+        key = (post_id, user_id)
+        with self._lock:
+            buffered = key in self._pending
+        stored = None if buffered else Like.objects.filter(post_id=post_id, user_id=user_id).exists()
+
+        with self._lock:
+            # Another thread may have toggled or flushed the pair in the meantime
+            if key in self._pending:
+                current = self._pending[key]
+            elif stored is not None:
+                current = stored
+            else:
+                current = Like.objects.filter(post_id=post_id, user_id=user_id).exists()
+            self._pending[key] = not current
+            started = self._oldest is None
+            if started:
+                self._oldest = time.monotonic()
+
+        if started and self.background_flush:
+            self.start_flusher()
+            self._wakeup.set()
+        self.flush_if_due()
+        return not current
+
+    def start_flusher(self):
+        """
+        Starts the daemon thread that flushes toggles once they are
+        flush_interval seconds old, if it is not running yet.
+        """
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='like-buffer-flush', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            with self._lock:
+                oldest = self._oldest
+            if oldest is None:
+                # Sleep until toggle() starts a new batch
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = oldest + self.flush_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            self.flush_if_due()
+            close_old_connections()
+
+    def is_due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return (
+                len(self._pending) >= self.max_pending
+                or time.monotonic() - self._oldest >= self.flush_interval
+            )
+
+    def flush_if_due(self, **kwargs):
+        # Runs inside requests and request_finished; a failed batch stays
+        # queued for the next flush instead of failing the request
+        if not self.is_due():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Like buffer flush failed; keeping the batch for the next flush')
+
+    def flush(self):
+        """
+        Writes all pending toggles to the database in one batch.
+        Returns the number of likes created and deleted.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._oldest = None
+        if not pending:
+            return 0, 0
+
+        try:
+            for attempt in range(self.write_attempts):
+                try:
+                    to_create, to_delete = self._write(pending)
+                    break
+                except IntegrityError:
+                    # A pair was inserted (or a post deleted) since the SELECT;
+                    # the transaction rolled back, so select and write again
+                    if attempt == self.write_attempts - 1:
+                        raise
+        except Exception:
+            # Put the batch back unless the pair was toggled again meanwhile
+            with self._lock:
+                for key, liked in pending.items():
+                    self._pending.setdefault(key, liked)
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+            raise
+
+        for post_id, _ in to_create:
+            trending.record(post_id, 'like')
+        self._notify(to_create)
+        return len(to_create), len(to_delete)
+
+    def _write(self, pending):
+        post_ids = {post_id for post_id, _ in pending}
+        user_ids = {user_id for _, user_id in pending}
+
+        # Likes of deleted posts or users would fail the foreign keys (and the whole batch)
+        post_ids = set(Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True))
+        user_ids = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+
+        with transaction.atomic():
+            existing = {
+                (post_id, user_id): pk
+                for pk, post_id, user_id in Like.objects.filter(
+                    post_id__in=post_ids, user_id__in=user_ids
+                ).values_list('pk', 'post_id', 'user_id')
+                if (post_id, user_id) in pending
+            }
+            to_create = [
+                (post_id, user_id) for (post_id, user_id), liked in pending.items()
+                if liked and (post_id, user_id) not in existing and post_id in post_ids and user_id in user_ids
+            ]
+            to_delete = [key for key, liked in pending.items() if not liked and key in existing]
+
+            Like.objects.bulk_create([Like(post_id=post_id, user_id=user_id) for post_id, user_id in to_create])
+            Like.objects.filter(pk__in=[existing[key] for key in to_delete]).delete()
+
+            deltas = defaultdict(int)
+            for post_id, _ in to_create:
+                deltas[post_id] += 1
+            for post_id, _ in to_delete:
+                deltas[post_id] -= 1
+            for post_id, delta in deltas.items():
+                if delta:
+                    adjust_post_counter(post_id, 'like_count', delta)
+            if any(deltas.values()):
+                # like_count is part of cached post list responses
+                bump_versions_on_commit(POST_LIST)
+
+        return to_create, to_delete
+
+    def _notify(self, created):
+        if not created:
+            return
+        posts = Post.objects.select_related('author').in_bulk({post_id for post_id, _ in created})
+        users = get_user_model().objects.in_bulk({user_id for _, user_id in created})
+        # Self-likes are filtered out by the notification helper
+        create_notifications_async([
+            (posts[post_id].author, users[user_id], 'liked', posts[post_id])
+            for post_id, user_id in created
+            if post_id in posts and user_id in users
+        ])
+
+like_buffer = LikeBuffer(
+    max_pending=getattr(settings, 'LIKE_BUFFER_MAX_PENDING', 500),
+    flush_interval=getattr(settings, 'LIKE_BUFFER_FLUSH_INTERVAL', 2.0),
+    background_flush=getattr(settings, 'LIKE_BUFFER_BACKGROUND_FLUSH', True),
+)
+
+# Flush stale toggles after any request, and whatever is left when the process exits
+request_finished.connect(like_buffer.flush_if_due, dispatch_uid='posts.likes.flush_if_due')
+atexit.register(like_buffer.flush)
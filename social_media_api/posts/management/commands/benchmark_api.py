@@ -0,0 +1,285 @@
+# posts/management/commands/benchmark_api.py
+
+import asyncio
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from notifications.models import Notification
+from posts.likes import like_buffer
+from posts.models import Post, Comment, Like, FeedEntry
+from social_media_api.synthetic import SocialGraphGenerator
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_api_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the hot API endpoints (post list and search, feed, like toggle, notifications, '
+        'and the async versions of the list, feed and notifications) in-process through the test '
+        'client or the ASGI application, or against a running server, and reports latency '
+        'percentiles, throughput and query counts per endpoint. Intended for a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Generate a synthetic social graph with this many users first.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per endpoint (default: 200).')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Unmeasured requests per endpoint before timing (default: 10).')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Requests in flight at once: client threads, or with --asgi '
+                                 'concurrent tasks on one event loop (default: 1).')
+        parser.add_argument('--clients', type=int, default=50,
+                            help='Authenticated users requests are spread over (default: 50).')
+        parser.add_argument('--url',
+                            help='Base URL of a running server sharing this database, e.g. '
+                                 'http://127.0.0.1:8000 (query counts need QUERY_BUDGET_HEADERS on '
+                                 'there). Requests run in-process when omitted.')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Run in-process through the ASGI application (social_media_api/asgi.py) '
+                                 'on one event loop instead of the test client on threads.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only run this endpoint (repeatable).')
+        parser.add_argument('--output', help='Also write the JSON report to this file.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        if options['seed']:
+            self.stdout.write(f"Generating {options['seed']} users and their activity...")
+            SocialGraphGenerator(options['seed'], prefix=BENCH_PREFIX, log=self.stdout.write).generate()
+
+        tokens = self.client_tokens(options['clients'])
+        if not tokens:
+            raise CommandError('No users with activity found; run with --seed N first.')
+        endpoints = self.endpoints()
+        selected = options['endpoints'] or list(endpoints)
+        unknown = set(selected) - set(endpoints)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        if options['url'] and options['asgi']:
+            raise CommandError('--asgi runs in-process; it cannot be combined with --url.')
+        transport = 'http' if options['url'] else 'asgi' if options['asgi'] else 'test-client'
+
+        report = {
+            'target': options['url'] or 'in-process',
+            'transport': transport,
+            'vendor': connection.vendor,
+            'rows': self.table_sizes(),
+            'concurrency': options['concurrency'],
+            'endpoints': {},
+        }
+        send = {
+            'http': lambda: self.remote_sender(options['url']),
+            'asgi': self.asgi_sender,
+            'test-client': self.local_sender,
+        }[transport]()
+        run = self.arun if transport == 'asgi' else self.run
+        # The test client's host must pass ALLOWED_HOSTS; query counts are read from X-Query-Count
+        with override_settings(ALLOWED_HOSTS=['testserver'], QUERY_BUDGET_HEADERS=True):
+            for name in selected:
+                self.stdout.write(f'Benchmarking {name}...')
+                report['endpoints'][name] = run(
+                    endpoints[name], send, tokens, options['requests'], options['warmup'], options['concurrency'],
+                )
+        # Write buffered like toggles now rather than at interpreter exit
+        like_buffer.flush()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"Target: {report['target']} ({transport}, concurrency {report['concurrency']})  "
+            f"database: {report['vendor']}  rows: {report['rows']}"
+        )
+        for name, result in report['endpoints'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(
+                f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+                f"{result['throughput_rps']:.1f} req/s, {result['queries_mean']} queries/request, "
+                f"{result['errors']} errors"
+            )
+
+    # --- Workload ---
+
+    def client_tokens(self, count):
+        # Authors, whose notification lists are not empty
+        user_ids = list(
+            Post.objects.order_by().values_list('author_id', flat=True).distinct()[:count]
+        )
+        return [Token.objects.get_or_create(user_id=user_id)[0].key for user_id in user_ids]
+
+    def endpoints(self):
+        """{name: build()} where build() returns (method, path) for one request."""
+        post_ids = list(Post.objects.order_by('-like_count').values_list('pk', flat=True)[:500])
+        titles = list(Post.objects.filter(pk__in=post_ids[:100]).values_list('title', flat=True))
+
+        def word():
+            return random.choice(random.choice(titles).split()) if titles else 'post'
+
+        return {
+            'post_list': lambda: ('GET', reverse('post-list')),
+            'post_list_search': lambda: ('GET', f"{reverse('post-list')}?{urlencode({'search': word()})}"),
+            'post_search': lambda: ('GET', f"{reverse('post_search')}?{urlencode({'q': word()})}"),
+            'feed': lambda: ('GET', reverse('user_feed')),
+            'like_toggle': lambda: ('POST', reverse('post_like_toggle', kwargs={'pk': random.choice(post_ids)})),
+            'notifications': lambda: ('GET', reverse('notifications-list')),
+            # Async views (social_media_api/asyncviews.py); compare with --asgi
+            'post_list_async': lambda: ('GET', reverse('post_list_async')),
+            'feed_async': lambda: ('GET', reverse('user_feed_async')),
+            'notifications_async': lambda: ('GET', reverse('notification_list_async')),
+        }
+
+    def table_sizes(self):
+        return {
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'likes': Like.objects.count(),
+            'feed_entries': FeedEntry.objects.count(),
+            'notifications': Notification.objects.count(),
+        }
+
+    # --- Transport ---
+
+    def local_sender(self):
+        def send(method, path, token):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+            response = client.generic(method, path)
+            return response.status_code, response.headers.get('X-Query-Count')
+        return send
+
+    def remote_sender(self, base_url):
+        def send(method, path, token):
+            request = urllib.request.Request(
+                base_url.rstrip('/') + path, method=method, headers={'Authorization': f'Token {token}'},
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    return response.status, response.headers.get('X-Query-Count')
+            except urllib.error.HTTPError as error:
+                return error.code, error.headers.get('X-Query-Count')
+        return send
+
+    def asgi_sender(self):
+        """
+        Calls the ASGI application directly with one HTTP request per call, the
+        way a server such as uvicorn would, minus the sockets.
+        """
+        from social_media_api.asgi import application
+
+        async def send(method, path, token):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', b'testserver'), (b'authorization', f'Token {token}'.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+            request_sent = False
+            finished = asyncio.Event()
+            response = {}
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Django listens for a client disconnect while the view runs
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send_message(message):
+                if message['type'] == 'http.response.start':
+                    response['status'] = message['status']
+                    headers = {name.lower(): value for name, value in message['headers']}
+                    response['queries'] = headers.get(b'x-query-count')
+                elif not message.get('more_body'):
+                    finished.set()
+
+            await application(scope, receive, send_message)
+            finished.set()
+            queries = response.get('queries')
+            return response['status'], queries.decode() if queries else None
+        return send
+
+    # --- Measurement ---
+
+    def run(self, build, send, tokens, requests, warmup, concurrency):
+        def one(_):
+            method, path = build()
+            start = time.perf_counter()
+            status_code, queries = send(method, path, random.choice(tokens))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # The test client keeps connections open; release them as a server would after a request
+            close_old_connections()
+            return elapsed_ms, status_code, queries
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(warmup)))
+            start = time.perf_counter()
+            samples = list(pool.map(one, range(requests)))
+            elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed)
+
+    def arun(self, build, send, tokens, requests, warmup, concurrency):
+        """run() for the ASGI sender: `concurrency` requests in flight on one event loop."""
+        async def measure():
+            slots = asyncio.Semaphore(concurrency)
+
+            async def one(_):
+                method, path = build()
+                async with slots:
+                    start = time.perf_counter()
+                    status_code, queries = await send(method, path, random.choice(tokens))
+                    return (time.perf_counter() - start) * 1000, status_code, queries
+
+            await asyncio.gather(*map(one, range(warmup)))
+            start = time.perf_counter()
+            samples = await asyncio.gather(*map(one, range(requests)))
+            return samples, time.perf_counter() - start
+
+        return self.summarize(*asyncio.run(measure()))
+
+    def summarize(self, samples, elapsed):
+        """Latency percentiles, throughput and query counts of (ms, status, queries) samples."""
+        timings = [ms for ms, _, _ in samples]
+        queries = [int(count) for _, _, count in samples if count is not None]
+        # 99 cut points: index 49 is p50, 94 is p95, 98 is p99
+        cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, status_code, _ in samples if status_code >= 400),
+            'p50_ms': round(cuts[49], 3),
+            'p95_ms': round(cuts[94], 3),
+            'p99_ms': round(cuts[98], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'queries_mean': round(statistics.fmean(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+        }
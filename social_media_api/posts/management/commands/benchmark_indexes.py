@@ -0,0 +1,172 @@
+# posts/management/commands/benchmark_indexes.py
+
+import json
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from notifications.models import Notification
+from posts.models import Post, Comment
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_index_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints query plans and latency for the hot query shapes of posts and notifications, '
+        'with and without the Meta.indexes added for them. Intended for a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic notifications (and a tenth as many posts) first.')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Number of synthetic users to spread seeded rows over (default: 1000).')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Executions per query shape (default: 50).')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also time each shape with the indexes temporarily dropped.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'], options['users'])
+
+        user = self.sample_user()
+        if user is None:
+            raise CommandError('No notifications found; run with --seed N first.')
+
+        shapes = self.query_shapes(user)
+        results = {'vendor': connection.vendor, 'rows': self.table_sizes(), 'queries': {}}
+
+        for name, build in shapes.items():
+            results['queries'][name] = {
+                'plan': build().explain(),
+                'indexed_ms': self.time_query(build, options['repeat']),
+            }
+
+        if options['compare']:
+            with self.indexes_dropped():
+                for name, build in shapes.items():
+                    results['queries'][name]['plan_without_indexes'] = build().explain()
+                    results['queries'][name]['unindexed_ms'] = self.time_query(build, options['repeat'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"Database: {results['vendor']}  rows: {results['rows']}")
+        for name, result in results['queries'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(result['plan'])
+            line = f"median {result['indexed_ms']:.3f} ms"
+            if 'unindexed_ms' in result:
+                self.stdout.write(result['plan_without_indexes'])
+                line += f" (without indexes: {result['unindexed_ms']:.3f} ms)"
+            self.stdout.write(line)
+
+    # --- Query shapes ---
+
+    def sample_user(self):
+        notification = Notification.objects.order_by('recipient_id').only('recipient_id').first()
+        return notification and User.objects.get(pk=notification.recipient_id)
+
+    def query_shapes(self, user):
+        followed = list(User.objects.exclude(pk=user.pk).values_list('pk', flat=True)[:200])
+        post_id = Post.objects.order_by('-comment_count').values_list('pk', flat=True).first() or 0
+        return {
+            'notification_page': lambda: Notification.objects.filter(recipient=user)
+                .order_by('-timestamp', '-id')[:20],
+            'unread_count': lambda: Notification.objects.filter(recipient=user, is_read=False)
+                .values('pk'),
+            'post_list_page': lambda: Post.objects.order_by('-created_at', '-id')[:10],
+            'posts_by_followed_authors': lambda: Post.objects.filter(author_id__in=followed)
+                .order_by('-created_at', '-id')[:10],
+            'comments_of_post': lambda: Comment.objects.filter(post_id=post_id).order_by('created_at'),
+        }
+
+    def time_query(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def table_sizes(self):
+        return {
+            'notifications': Notification.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+        }
+
+    @contextmanager
+    def indexes_dropped(self):
+        models = (Post, Comment, Notification)
+        self.stdout.write('Dropping indexes for comparison...')
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        try:
+            yield
+        finally:
+            self.stdout.write('Recreating indexes...')
+            with connection.schema_editor() as editor:
+                for model in models:
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+
+    # --- Seeding ---
+
+    def seed(self, notifications, users, batch_size=10000):
+        self.stdout.write(f'Seeding {notifications} notifications over {users} users...')
+        existing = User.objects.filter(username__startswith=BENCH_PREFIX).count()
+        User.objects.bulk_create(
+            [User(username=f'{BENCH_PREFIX}{i}', password='!') for i in range(existing, users)],
+            batch_size=batch_size,
+        )
+        user_ids = list(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+        post_type = ContentType.objects.get_for_model(Post)
+        now = timezone.now()
+
+        # Power-law recipients so a few users own most rows, as in production
+        def pick_user():
+            return user_ids[min(int(random.paretovariate(1.2)) - 1, len(user_ids) - 1)]
+
+        def seconds_ago():
+            return now - timedelta(seconds=random.randint(0, 90 * 24 * 3600))
+
+        for start in range(0, notifications // 10, batch_size):
+            size = min(batch_size, notifications // 10 - start)
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(author_id=random.choice(user_ids), title='Benchmark', content='Synthetic post')
+                    for _ in range(size)
+                ])
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:100000])
+
+        for start in range(0, notifications, batch_size):
+            size = min(batch_size, notifications - start)
+            with transaction.atomic():
+                created = Notification.objects.bulk_create([
+                    Notification(
+                        recipient_id=pick_user(), actor_id=random.choice(user_ids), verb='liked',
+                        content_type=post_type, object_id=random.choice(post_ids),
+                        is_read=random.random() < 0.9,
+                    )
+                    for _ in range(size)
+                ])
+                # auto_now_add ignores explicit values, so spread timestamps afterwards
+                for notification in created:
+                    notification.timestamp = seconds_ago()
+                Notification.objects.bulk_update(created, ['timestamp'])
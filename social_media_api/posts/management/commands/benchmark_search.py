@@ -0,0 +1,131 @@
+# posts/management/commands/benchmark_search.py
+
+import itertools
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from posts.models import Post
+from posts.search import get_search_backend
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_search_author'
+
+
+class SearchFilterView:
+    # The attributes SearchFilter reads from PostViewSet before this change
+    search_fields = ['title', 'content']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares DRF's SearchFilter (LIKE '%term%' scans) with the full-text search "
+        'backend on the posts table. Intended for a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic posts first.')
+        parser.add_argument('--vocabulary', type=int, default=20000,
+                            help='Number of distinct synthetic words (default: 20000).')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Executions per query (default: 20).')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+        parser.add_argument('queries', nargs='*',
+                            help='Search strings to time (default: a common, a rare and a two-word query).')
+
+    def handle(self, *args, **options):
+        words = [self.word(index) for index in range(options['vocabulary'])]
+        if options['seed']:
+            self.seed(options['seed'], words)
+        if not Post.objects.exists():
+            raise CommandError('No posts found; run with --seed N first.')
+
+        queries = options['queries'] or [words[0], words[len(words) // 2], f'{words[1]} {words[5]}']
+        backend = get_search_backend()
+        results = {
+            'vendor': connection.vendor,
+            'backend': type(backend).__name__,
+            'posts': Post.objects.count(),
+            'queries': {},
+        }
+
+        for query in queries:
+            like_page = lambda: self.search_filter(query).order_by('-created_at', '-id')[:10]
+            fts_page = lambda: backend.search(Post.objects.all(), query).order_by('-created_at', '-id')[:10]
+            ranked_page = lambda: backend.search(Post.objects.all(), query).order_by('-search_rank', '-id')[:10]
+            results['queries'][query] = {
+                'matches': backend.search(Post.objects.all(), query).count(),
+                'search_filter_ms': self.time_query(like_page, options['repeat']),
+                'full_text_ms': self.time_query(fts_page, options['repeat']),
+                'full_text_ranked_ms': self.time_query(ranked_page, options['repeat']),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"Database: {results['vendor']}  backend: {results['backend']}  posts: {results['posts']}"
+        )
+        for query, result in results['queries'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{query!r} ({result["matches"]} matches)'))
+            self.stdout.write(
+                f"SearchFilter {result['search_filter_ms']:.3f} ms, "
+                f"full-text {result['full_text_ms']:.3f} ms, "
+                f"full-text ranked {result['full_text_ranked_ms']:.3f} ms (medians)"
+            )
+
+    # --- Queries ---
+
+    def search_filter(self, query):
+        request = Request(APIRequestFactory().get('/', {'search': query}))
+        return SearchFilter().filter_queryset(request, Post.objects.all(), SearchFilterView())
+
+    def time_query(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    # --- Seeding ---
+
+    @staticmethod
+    def word(index):
+        # Deterministic pronounceable words, so queries can be named on the command line
+        consonants, vowels = 'bcdfghklmnprstvz', 'aeiou'
+        letters = []
+        while True:
+            index, c = divmod(index, len(consonants))
+            index, v = divmod(index, len(vowels))
+            letters.append(consonants[c] + vowels[v])
+            if not index:
+                return ''.join(letters)
+
+    def seed(self, posts, words, batch_size=5000):
+        self.stdout.write(f'Seeding {posts} posts...')
+        author, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'password': '!'})
+
+        # Zipf-like word frequencies, as in natural text
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+        def text(length):
+            return ' '.join(random.choices(words, cum_weights=cum_weights, k=length))
+
+        for start in range(0, posts, batch_size):
+            size = min(batch_size, posts - start)
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(author=author, title=text(6), content=text(random.randint(20, 120)))
+                    for _ in range(size)
+                ])
@@ -0,0 +1,26 @@
+# posts/management/commands/rebuild_feeds.py
+
+from django.core.management.base import BaseCommand
+from accounts.models import CustomUser
+from posts.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills every user\'s materialized feed with the newest FEED_MAX_ENTRIES posts of the '
+        'fanned-out authors they follow. Run once after deploying the feed table; safe to repeat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of user ids read per query (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        users = posts = 0
+        user_ids = CustomUser.objects.order_by('pk').values_list('pk', flat=True)
+        for user_id in user_ids.iterator(chunk_size=options['batch_size']):
+            posts += rebuild_feed(user_id)
+            users += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {users} feed(s) from {posts} post(s).'))
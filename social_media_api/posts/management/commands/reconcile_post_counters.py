@@ -0,0 +1,18 @@
+# posts/management/commands/reconcile_post_counters.py
+
+from django.core.management.base import BaseCommand
+from posts.counters import reconcile_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Post.comment_count and Post.like_count from the comments and likes tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of posts checked per UPDATE (default: 10000).'
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_post_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled counters on {fixed} post(s).'))
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:53
+
+import django.db.models.deletion
+import posts.models
+from django.db import migrations, models
+
+# External-content FTS5 table: stores only the inverted index, reading the
+# text from posts_post. Triggers keep it in step with every write path,
+# including bulk_create and QuerySet.update(). Note that SQLite table rebuilds
+# (some AlterField/RemoveField on Post) drop the triggers; such a migration
+# must run SQLITE_TRIGGERS again.
+SQLITE_TABLE = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "title, content, content='posts_post', content_rowid='id', tokenize='porter unicode61')",
+    # Matches in the title count twice as much as in the content
+    "INSERT INTO posts_post_fts(posts_post_fts, rank) VALUES('rank', 'bm25(2.0, 1.0)')",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES('rebuild')",
+]
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF title, content ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TABLE IF EXISTS posts_post_fts',
+]
+
+# PostgreSQL needs no triggers: a GIN index over the same tsvector expression
+# posts/search.py queries with is maintained by the database itself.
+POSTGRES_INDEX = 'posts_post_search_idx'
+
+
+def postgres_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('content', weight='B', config='english')
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_TABLE + SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+
+        schema_editor.add_index(
+            apps.get_model('posts', 'Post'), GinIndex(postgres_vector(), name=POSTGRES_INDEX)
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='posts.post')),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+                ('document', posts.models.SearchDocumentField(db_column='posts_post_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
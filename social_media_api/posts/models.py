@@ -1,6 +1,7 @@
 # posts/models.py
 
 from django.db import models
+from django.db.models import Lookup
 from django.conf import settings # Best practice to refer to the active user model
 
 class Post(models.Model):
@@ -17,8 +18,19 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, kept in step with F() updates by the views
+    # (see reconcile_post_counters for repairing drift)
+    comment_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ['-created_at'] # Default order: newest first
+        indexes = [
+            # Keyset-paginated post list: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], name='posts_post_created_idx'),
+            # Author timelines and fan-out-on-read: author_id IN (...) ORDER BY created_at DESC
+            models.Index(fields=['author', '-created_at', '-id'], name='posts_post_author_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} by {self.author.username}'
@@ -44,14 +56,15 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at'] # Default order: oldest first
+        indexes = [
+            # Comments of a post in display order
+            models.Index(fields=['post', 'created_at'], name='posts_comment_post_created_idx'),
+            # Recent comments replayed by the trending warm-up
+            models.Index(fields=['created_at'], name='posts_comment_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on post "{self.post.title[:20]}..."'
-# posts/models.py (Add to existing content)
-
-from django.db import models
-from django.conf import settings
-# ... (Existing Post and Comment models) ...
 
 class Like(models.Model):
     post = models.ForeignKey(
@@ -70,6 +83,73 @@ class Like(models.Model):
         # Ensures a user can only like a post once
         unique_together = ('post', 'user')
         ordering = ['-created_at']
+        indexes = [
+            # Recent likes replayed by the trending warm-up
+            models.Index(fields=['created_at'], name='posts_like_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} likes {self.post.title}'
+
+class FeedEntry(models.Model):
+    # Materialized home feed: one row per (follower, post), written when the post is created
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copied from the post so a feed page is a range scan over (user, created_at, post)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        ordering = ['-created_at']
+        indexes = [
+            # Matches the feed's (created_at, post) keyset order, so pages need no sort
+            models.Index(fields=['user', '-created_at', '-post'], name='posts_feed_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f'Post {self.post_id} in feed of user {self.user_id}'
+
+
+class SearchDocumentField(models.TextField):
+    # The FTS5 hidden column named after its table; supports `__match`
+    pass
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+class PostSearchIndex(models.Model):
+    # SQLite FTS5 index over Post.title/content, filled by triggers on posts_post
+    # (migration 0006). Read-only, and only present on SQLite; see posts/search.py
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index'
+    )
+    title = models.TextField()
+    content = models.TextField()
+    document = SearchDocumentField(db_column='posts_post_fts')
+    # bm25() score of the current MATCH; lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
 
     def __str__(self):
-        return f'{self.user.username} likes {self.post.title}'
\ No newline at end of file
+        return f'Search index entry for post {self.post_id}'
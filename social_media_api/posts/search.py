@@ -0,0 +1,138 @@
+# posts/search.py
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Value, FloatField
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+# Text search configuration of the PostgreSQL GIN index (migration 0006);
+# queries must build the exact same expression for the index to be used
+POSTGRES_CONFIG = 'english'
+
+# Upper bound on terms taken from a query string
+MAX_TERMS = 16
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    """
+    Interface for post search engines.
+
+    search() narrows a Post queryset to the posts matching every term of the
+    query and annotates each with `search_rank`, where higher is better.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_results(self, queryset):
+        # Keeps the annotation so callers can still order by search_rank
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    """
+    Fallback for databases without a full-text index: the same
+    `LIKE '%term%'` scans as DRF's SearchFilter, unranked.
+    """
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Joins the posts_post_fts FTS5 table (PostSearchIndex) and ranks by bm25.
+    Each term is quoted, so user input never reaches the FTS5 query syntax.
+    """
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        expression = ' '.join(f'"{term}"' for term in terms)
+        return (
+            queryset.filter(search_index__document__match=expression)
+            .annotate(search_rank=-F('search_index__rank'))
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Matches a weighted tsvector (title A, content B) served by a GIN expression
+    index, with websearch_to_tsquery parsing and ts_rank ordering.
+    """
+
+    def vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('title', weight='A', config=POSTGRES_CONFIG)
+            + SearchVector('content', weight='B', config=POSTGRES_CONFIG)
+        )
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        if not search_terms(query):
+            return self.no_results(queryset)
+        vector = self.vector()
+        ts_query = SearchQuery(query, search_type='websearch', config=POSTGRES_CONFIG)
+        return (
+            queryset.annotate(search_document=vector)
+            .filter(search_document=ts_query)
+            .annotate(search_rank=SearchRank(vector, ts_query))
+        )
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    Returns the backend named by POSTS_SEARCH_BACKEND, or the one matching the
+    database vendor when it is unset.
+    """
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, ContainsSearchBackend)()
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter on Post querysets (same ?search=
+    parameter) that goes through the full-text index instead of LIKE scans.
+    It only filters; the view's ordering or pagination decides the order.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return get_search_backend().search(queryset, query)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over title and content.',
+            'schema': {'type': 'string'},
+        }]
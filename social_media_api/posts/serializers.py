@@ -14,24 +14,39 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'author', 'author_username', 'post', 'content', 'created_at']
         read_only_fields = ['author', 'post'] # author and post are set automatically by the view
 
-# --- Post Serializer ---
+# --- Post Serializers ---
 
 class PostSerializer(serializers.ModelSerializer):
-    # Nested representation of comments (for detail view)
-    comments = CommentSerializer(many=True, read_only=True)
-    
+    """
+    Lightweight post representation used by list, feed and write actions.
+    Comments are not nested here, so payload size does not grow with comment volume.
+    """
     # Read-only field to display the post author's username
     author_username = serializers.CharField(source='author.username', read_only=True)
-    
-    # Count of comments for list view efficiency
-    comment_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ['id', 'author', 'author_username', 'title', 'content', 
-                  'created_at', 'updated_at', 'comment_count', 'comments']
-        read_only_fields = ['author'] # Author is set automatically by the view
-
-    def get_comment_count(self, obj):
-        # Efficiently get the count of comments
-        return obj.comments.count()
\ No newline at end of file
+                  'created_at', 'updated_at', 'comment_count', 'like_count']
+        # Author is set automatically by the view; the counters are denormalized columns
+        read_only_fields = ['author', 'comment_count', 'like_count']
+
+class TrendingPostSerializer(PostSerializer):
+    """
+    Post list item for the trending endpoint, with its decayed engagement score.
+    Expects the view to set `trending_score` on each post.
+    """
+    trending_score = serializers.FloatField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['trending_score']
+
+class PostDetailSerializer(PostSerializer):
+    """
+    Detail representation: adds a bounded list of the most recent comments.
+    Expects the view to prefetch them into `recent_comments`.
+    """
+    comments = CommentSerializer(source='recent_comments', many=True, read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['comments']
@@ -0,0 +1,37 @@
+# posts/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .caching import POST_LIST, bump_versions_on_commit, comments_scope
+from .models import Post, Comment
+from .trending import trending
+
+# Like rows are only written by posts.likes.LikeBuffer, which bumps the
+# versions itself once per flush (its bulk writes send no model signals).
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    bump_versions_on_commit(POST_LIST)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: trending.remove(post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # The post list shows comment_count
+    bump_versions_on_commit(POST_LIST, comments_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        post_id, at = instance.post_id, instance.created_at.timestamp()
+        transaction.on_commit(lambda: trending.record(post_id, 'comment', at))
@@ -0,0 +1,13 @@
+# posts/tasks.py
+
+from notifications.queue import task
+from .feed import refill_author_feeds
+
+
+@task
+def refill_feeds(author_id):
+    """
+    Background task: stores an author's recent posts in their followers' feeds
+    once the author is back under FEED_FANOUT_MAX_FOLLOWERS (see posts/feed.py).
+    """
+    refill_author_feeds(author_id)
@@ -1,3 +1,775 @@
-from django.test import TestCase
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.db.models import F
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.counters import reconcile_follow_counts
+from accounts.graph import Follow
+from social_media_api.synthetic import SocialGraphGenerator
+from notifications.models import Notification
+from social_media_api.querybudget import QueryBudgetExceeded, QueryRecorder
+from .counters import reconcile_post_counters
+from .likes import LikeBuffer, like_buffer
+from .models import Post, Comment, Like, FeedEntry
+from .trending import HALF_LIFE, TrendingTracker, trending
+from .views import PostViewSet
+
+User = get_user_model()
+
+
+class PostAPITestCase(APITestCase):
+    """
+    Base class for the posts API tests.
+    Creates an author with two followers and a user who follows nobody.
+    """
+    def setUp(self):
+        cache.clear()
+        # Tests flush the buffer themselves, on the test's own connection
+        background_flush = patch.object(like_buffer, 'background_flush', False)
+        background_flush.start()
+        self.addCleanup(background_flush.stop)
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.follower = User.objects.create_user(username='follower', password='password123')
+        self.other_follower = User.objects.create_user(username='other', password='password123')
+        self.stranger = User.objects.create_user(username='stranger', password='password123')
+
+        self.follower.following.add(self.author)
+        self.other_follower.following.add(self.author)
+        reconcile_follow_counts()
+        self.author.refresh_from_db()
+
+        self.posts_url = reverse('post-list')
+        self.feed_url = reverse('user_feed')
+
+    def tearDown(self):
+        # Don't leak buffered like toggles into the next test
+        like_buffer.flush()
+
+    def create_post(self, user, title='Hello'):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.posts_url, {'title': title, 'content': 'Body'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Post.objects.get(pk=response.data['id'])
+
+
+class FeedFanOutTests(PostAPITestCase):
+    """Tests the materialized (fan-out-on-write) home feed."""
+
+    def test_create_post_fans_out_to_followers(self):
+        """Creating a post writes one FeedEntry per follower."""
+        post = self.create_post(self.author)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(post=post).values_list('user_id', flat=True)),
+            {self.follower.pk, self.other_follower.pk},
+        )
+
+    def test_feed_lists_followed_posts_newest_first(self):
+        first = self.create_post(self.author, title='First')
+        second = self.create_post(self.author, title='Second')
+        self.create_post(self.stranger, title='Not followed')
+
+        self.client.force_authenticate(user=self.follower)
+        response = self.client.get(self.feed_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [second.pk, first.pk])
+
+    def test_high_follower_author_is_read_on_demand(self):
+        """Authors above the fan-out limit are merged into the feed at read time."""
+        with patch('posts.feed.FANOUT_MAX_FOLLOWERS', 1):
+            post = self.create_post(self.author)
+            self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+            self.client.force_authenticate(user=self.follower)
+            response = self.client.get(self.feed_url)
+        ids = [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [post.pk])
+
+    def test_follow_backfills_and_unfollow_purges_feed(self):
+        post = self.create_post(self.author)
+        self.client.force_authenticate(user=self.stranger)
+
+        self.client.post(reverse('user_follow', kwargs={'user_id': self.author.pk}))
+        self.assertTrue(FeedEntry.objects.filter(user=self.stranger, post=post).exists())
+
+        self.client.post(reverse('user_unfollow', kwargs={'user_id': self.author.pk}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.stranger).exists())
+
+    def test_feed_merges_entries_and_pulled_posts_by_cursor(self):
+        # Fanned out while the author was below the limit, then also pulled
+        posts = [self.create_post(self.author, title='Before')]
+        self.client.force_authenticate(user=self.follower)
+        self.client.post(reverse('user_follow', kwargs={'user_id': self.stranger.pk}))
+        with patch('posts.feed.FANOUT_MAX_FOLLOWERS', 1):
+            # The author (2 followers) is now pulled; the stranger (1 follower) is fanned out
+            for i in range(3):
+                posts += [self.create_post(self.author, title=f'Pulled {i}'),
+                          self.create_post(self.stranger, title=f'Fanned {i}')]
+
+            self.client.force_authenticate(user=self.follower)
+            response = self.client.get(self.feed_url, {'page_size': 2, 'count': 'true'})
+            self.assertEqual(response.data['count'], 7)
+            seen = []
+            while True:
+                seen += [item['id'] for item in response.data['results']]
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+            self.assertEqual(seen, [post.pk for post in reversed(posts)])
+
+            response = self.client.get(response.data['previous'])
+            self.assertEqual([item['id'] for item in response.data['results']], seen[-3:-1])
+
+    def test_fan_out_trims_feeds_to_the_newest_entries(self):
+        with patch('posts.feed.MAX_ENTRIES', 3), patch('posts.feed.TRIM_INTERVAL', 1):
+            posts = [self.create_post(self.author, title=f'Post {i}') for i in range(5)]
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.follower).order_by('-created_at').values_list('post_id', flat=True)),
+            [post.pk for post in reversed(posts[2:])],
+        )
+
+    def test_rebuild_feeds_fills_feeds_from_existing_follows(self):
+        posts = [self.create_post(self.author, title=f'Post {i}') for i in range(3)]
+        FeedEntry.objects.all().delete()
+
+        out = StringIO()
+        with patch('posts.feed.MAX_ENTRIES', 2):
+            call_command('rebuild_feeds', stdout=out)
+        self.assertIn('Rebuilt 4 feed(s)', out.getvalue())
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.follower).order_by('-created_at').values_list('post_id', flat=True)),
+            [posts[2].pk, posts[1].pk],
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.stranger).exists())
+
+    @override_settings(TASKS={'BACKEND': 'notifications.queue.ImmediateBackend'})
+    def test_author_back_under_the_limit_keeps_pulled_posts(self):
+        with patch('posts.feed.FANOUT_MAX_FOLLOWERS', 1):
+            post = self.create_post(self.author)
+            self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+            self.client.force_authenticate(user=self.other_follower)
+            self.client.post(reverse('user_unfollow', kwargs={'user_id': self.author.pk}))
+
+            self.client.force_authenticate(user=self.follower)
+            response = self.client.get(self.feed_url)
+        self.assertEqual([item['id'] for item in response.data['results']], [post.pk])
+        self.assertTrue(FeedEntry.objects.filter(user=self.follower, post=post).exists())
+
+
+class KeysetPaginationTests(PostAPITestCase):
+    """Tests cursor pagination on (created_at, id) for the posts list."""
+
+    def setUp(self):
+        super().setUp()
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='Body')
+            for i in range(5)
+        ]
+
+    def test_pages_follow_cursor(self):
+        response = self.client.get(self.posts_url, {'page_size': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertIsNone(response.data['previous'])
+        first_page = [item['id'] for item in response.data['results']]
+        self.assertEqual(first_page, [self.posts[4].pk, self.posts[3].pk])
+
+        # A post created while scrolling must not shift the next page
+        Post.objects.create(author=self.author, title='Newer', content='Body')
+
+        response = self.client.get(response.data['next'])
+        second_page = [item['id'] for item in response.data['results']]
+        self.assertEqual(second_page, [self.posts[2].pk, self.posts[1].pk])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], first_page)
+
+    def test_count_can_be_skipped(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.posts_url, {'count': 'false'})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.posts_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncReadViewTests(PostAPITestCase):
+    """Tests that the async post list and feed serve the same pages as the DRF views."""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            self.create_post(self.author, title=f'Post {i}')
+        self.create_post(self.stranger, title='Unrelated')
+        self.client.force_authenticate(user=None)
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.follower).key}'}
+
+    async def drf_get(self, url, data=None):
+        return await sync_to_async(self.client.get)(url, data, headers=self.headers)
+
+    async def test_post_list_matches_drf_pages(self):
+        async_url = reverse('post_list_async')
+        response = await self.async_client.get(async_url, {'page_size': 2, 'count': 'true'})
+        expected = await self.drf_get(self.posts_url, {'page_size': 2, 'count': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+        self.assertEqual(response.json()['count'], 6)
+
+        # Cursors round-trip through the async view
+        response = await self.async_client.get(response.json()['next'])
+        expected = await self.drf_get(expected.json()['next'])
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+
+    async def test_post_list_search(self):
+        response = await self.async_client.get(reverse('post_list_async'), {'search': 'unrelated'})
+        self.assertEqual([post['title'] for post in response.json()['results']], ['Unrelated'])
+
+    async def test_post_list_filters_like_the_viewset(self):
+        response = await self.async_client.get(reverse('post_list_async'), {'author__username': 'stranger'})
+        self.assertEqual([post['title'] for post in response.json()['results']], ['Unrelated'])
+
+        created_at = response.json()['results'][0]['created_at']
+        response = await self.async_client.get(reverse('post_list_async'), {'created_at': created_at})
+        self.assertEqual([post['title'] for post in response.json()['results']], ['Unrelated'])
+
+    async def test_feed_matches_drf_feed(self):
+        response = await self.async_client.get(reverse('user_feed_async'), headers=self.headers)
+        expected = await self.drf_get(self.feed_url)
+        self.assertEqual(response.json(), {**expected.json(), 'next': None})
+        self.assertEqual(len(response.json()['results']), 5)
+
+    async def test_feed_with_pulled_authors_matches_drf_feed(self):
+        with patch('posts.feed.FANOUT_MAX_FOLLOWERS', 1):
+            await sync_to_async(self.create_post)(self.author, title='Pulled')
+            await sync_to_async(self.client.force_authenticate)(user=None)
+            response = await self.async_client.get(reverse('user_feed_async'), {'page_size': 2}, headers=self.headers)
+            expected = await self.drf_get(self.feed_url, {'page_size': 2})
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+        self.assertEqual(response.json()['count'], 6)
+        self.assertEqual(response.json()['results'][0]['title'], 'Pulled')
+
+    async def test_errors_are_rendered_like_drf(self):
+        response = await self.async_client.get(reverse('user_feed_async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+        response = await self.async_client.get(reverse('post_list_async'), headers={'Authorization': 'Token bad'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = await self.async_client.get(reverse('post_list_async'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.post(reverse('post_list_async'))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class PostCounterTests(PostAPITestCase):
+    """Tests the denormalized comment_count and like_count columns."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Counted', content='Body')
+        self.comments_url = reverse('post-comments-list', kwargs={'post_pk': self.post.pk})
+        self.like_url = reverse('post_like_toggle', kwargs={'pk': self.post.pk})
+
+    def test_comment_create_and_destroy_update_counter(self):
+        self.client.force_authenticate(user=self.follower)
+        response = self.client.post(self.comments_url, {'content': 'Nice'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        detail_url = reverse(
+            'post-comments-detail', kwargs={'post_pk': self.post.pk, 'pk': response.data['id']}
+        )
+        self.client.delete(detail_url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_like_toggle_updates_counter(self):
+        self.client.force_authenticate(user=self.follower)
+        self.client.post(self.like_url)
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(self.like_url)
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.follower, content='Raw insert')
+        Like.objects.create(post=self.post, user=self.follower)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)
+
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.like_count), (1, 1))
+
+
+class PostSerializerSplitTests(PostAPITestCase):
+    """Tests the flat list representation and the bounded detail representation."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Busy', content='Body')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.follower, content=f'Comment {i}')
+            for i in range(15)
+        ])
+
+    def test_list_does_not_embed_comments(self):
+        Post.objects.create(author=self.follower, title='Quiet', content='Body')
+        # Count + page
+        with self.assertNumQueries(2):
+            response = self.client.get(self.posts_url)
+        self.assertNotIn('comments', response.data['results'][0])
+
+    def test_detail_embeds_bounded_recent_comments(self):
+        with patch('posts.views.RECENT_COMMENTS_LIMIT', 5):
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(len(response.data['comments']), 5)
+        self.assertEqual(response.data['comments'][0]['content'], 'Comment 14')
+
+
+@override_settings(TASKS={'BACKEND': 'notifications.queue.ImmediateBackend'})
+class LikeBufferTests(PostAPITestCase):
+    """Tests the write-behind like buffer behind LikePostView."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Likeable', content='Body')
+        self.like_url = reverse('post_like_toggle', kwargs={'pk': self.post.pk})
+        self.client.force_authenticate(user=self.follower)
+
+    def test_toggle_returns_state_before_flush(self):
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['liked'])
+        self.assertFalse(Like.objects.exists())
+
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['liked'])
+
+    def test_flush_collapses_toggles_and_notifies_once(self):
+        for _ in range(3):
+            self.client.post(self.like_url)
+
+        self.assertEqual(like_buffer.flush(), (1, 0))
+        self.assertEqual(Like.objects.filter(post=self.post, user=self.follower).count(), 1)
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.author, verb='liked').count(), 1
+        )
+
+    def test_flush_deletes_unliked_rows(self):
+        Like.objects.create(post=self.post, user=self.follower)
+        Post.objects.filter(pk=self.post.pk).update(like_count=1)
+
+        self.client.post(self.like_url)
+        self.assertEqual(like_buffer.flush(), (0, 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_deleted_post_does_not_wedge_the_buffer(self):
+        doomed = Post.objects.create(author=self.author, title='Doomed', content='Body')
+        like_buffer.toggle(doomed.pk, self.follower.pk)
+        like_buffer.toggle(self.post.pk, self.follower.pk)
+        doomed.delete()
+
+        self.assertEqual(like_buffer.flush(), (1, 0))
+        self.assertEqual(list(Like.objects.values_list('post_id', flat=True)), [self.post.pk])
+        self.assertEqual(like_buffer.flush(), (0, 0))
+
+    def test_failed_flush_does_not_fail_the_request(self):
+        with patch.object(like_buffer, '_write', side_effect=RuntimeError), \
+                patch.object(like_buffer, 'max_pending', 1), self.assertLogs('posts.likes', 'ERROR'):
+            response = self.client.post(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The batch is kept and written by the next flush
+        self.assertEqual(like_buffer.flush(), (1, 0))
+
+    def test_pair_inserted_by_another_process_is_not_counted(self):
+        self.client.post(self.like_url)
+        write = like_buffer._write
+
+        def lose_race(pending):
+            # Another process inserts the pair between the flush's SELECT and INSERT
+            if not Like.objects.exists():
+                Like.objects.create(post=self.post, user=self.follower)
+                raise IntegrityError('UNIQUE constraint failed: posts_like.post_id, posts_like.user_id')
+            return write(pending)
+
+        with patch.object(like_buffer, '_write', side_effect=lose_race):
+            self.assertEqual(like_buffer.flush(), (0, 0))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(Notification.objects.filter(verb='liked').exists())
+
+    def test_background_thread_flushes_without_requests(self):
+        buffer = LikeBuffer(flush_interval=0.05)
+        with patch.object(buffer, '_write', return_value=([], [])) as write:
+            buffer.toggle(self.post.pk, self.follower.pk)
+            deadline = time.monotonic() + 5
+            while write.call_count == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        write.assert_called_once_with({(self.post.pk, self.follower.pk): True})
+
+
+class TrendingPostsTests(PostAPITestCase):
+    """Tests the in-memory trending ranking and its endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        trending.clear()
+        self.trending_url = reverse('post_trending')
+        self.first = Post.objects.create(author=self.author, title='First', content='Body')
+        self.second = Post.objects.create(author=self.author, title='Second', content='Body')
+
+    def like(self, user, post):
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('post_like_toggle', kwargs={'pk': post.pk}))
+
+    def test_likes_and_comments_rank_posts(self):
+        self.like(self.follower, self.first)
+        self.like(self.other_follower, self.first)
+        self.like(self.stranger, self.second)
+        like_buffer.flush()
+        self.client.force_authenticate(user=self.follower)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('post-comments-list', kwargs={'post_pk': self.second.pk}), {'content': 'Hi'})
+
+        response = self.client.get(self.trending_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([post['id'] for post in results], [self.second.pk, self.first.pk])
+        self.assertAlmostEqual(results[0]['trending_score'], 3.0, places=2)
+        self.assertAlmostEqual(results[1]['trending_score'], 2.0, places=2)
+        self.assertEqual(self.client.get(self.trending_url, {'limit': 1}).data['results'][0]['id'], self.second.pk)
+
+    def test_scores_decay(self):
+        tracker = TrendingTracker(half_life=3600, max_tracked=10)
+        tracker._warmed = True
+        now = time.time()
+        tracker.record(1, 'like', at=now - 7200)
+        tracker.record(1, 'like', at=now - 7200)
+        tracker.record(2, 'like', at=now)
+        (top_id, top_score), (next_id, next_score) = tracker.top(2)
+        self.assertEqual((top_id, next_id), (2, 1))
+        self.assertAlmostEqual(top_score, 1.0, places=2)
+        self.assertAlmostEqual(next_score, 0.5, places=2)
+
+    def test_lowest_posts_are_dropped(self):
+        tracker = TrendingTracker(half_life=3600, max_tracked=2)
+        tracker._warmed = True
+        for post_id in (1, 2, 3):
+            tracker.record(post_id, 'like', at=time.time() + post_id)
+        self.assertEqual([post_id for post_id, _ in tracker.top(5)], [3, 2])
+
+    def test_warm_up_replays_earlier_events(self):
+        Like.objects.create(post=self.first, user=self.follower)
+        Comment.objects.create(post=self.second, author=self.follower, content='Hi')
+        trending.clear()
+        self.assertEqual([post_id for post_id, _ in trending.top(5)], [self.second.pk, self.first.pk])
+
+    def test_warm_up_sums_decayed_events_per_post_in_sql(self):
+        Like.objects.create(post=self.first, user=self.follower)
+        Like.objects.create(post=self.first, user=self.other_follower)
+        Comment.objects.create(post=self.second, author=self.follower, content='Hi')
+        now = timezone.now()
+        Like.objects.update(created_at=now - timedelta(seconds=HALF_LIFE))
+        Comment.objects.update(created_at=now)
+        trending.clear()
+
+        with self.assertNumQueries(2):
+            (top_id, top_score), (next_id, next_score) = trending.top(5)
+        self.assertEqual((top_id, next_id), (self.second.pk, self.first.pk))
+        self.assertAlmostEqual(top_score, 2.0, places=2)
+        # Two likes, one half-life old
+        self.assertAlmostEqual(next_score, 1.0, places=2)
+        # Only the best max_tracked posts are loaded
+        self.assertEqual([post_id for post_id, _ in TrendingTracker(max_tracked=1).top(5)], [self.second.pk])
+
+    def test_deleted_posts_leave_the_ranking(self):
+        self.like(self.follower, self.first)
+        like_buffer.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(trending.top(5), [])
+
+    def test_served_without_scanning_posts(self):
+        self.like(self.follower, self.first)
+        like_buffer.flush()
+        trending.top(1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(self.trending_url).data['results']), 1)
+
+
+class ResponseCacheTests(PostAPITestCase):
+    """Tests the versioned list response cache and conditional GETs."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(author=self.author, title='Cached', content='Body')
+        self.comments_url = reverse('post-comments-list', kwargs={'post_pk': self.post.pk})
+
+    def test_repeat_read_skips_database(self):
+        first = self.client.get(self.posts_url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.posts_url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get(self.posts_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(self.posts_url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+        last_modified = self.client.get(self.posts_url)['Last-Modified']
+        response = self.client.get(self.posts_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_comment_write_invalidates_list_and_comments(self):
+        list_etag = self.client.get(self.posts_url)['ETag']
+        comments_etag = self.client.get(self.comments_url)['ETag']
+
+        self.client.force_authenticate(user=self.follower)
+        self.client.post(self.comments_url, {'content': 'New'})
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['comment_count'], 1)
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        self.assertEqual(len(response.data), 1)
+
+    def test_comments_of_other_posts_keep_etag(self):
+        etag = self.client.get(self.comments_url)['ETag']
+        other = Post.objects.create(author=self.author, title='Other', content='Body')
+        Comment.objects.create(post=other, author=self.follower, content='Elsewhere')
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_like_flush_invalidates_list(self):
+        etag = self.client.get(self.posts_url)['ETag']
+        like_buffer.toggle(self.post.pk, self.follower.pk)
+        like_buffer.flush()
+        response = self.client.get(self.posts_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+
+class QueryBudgetTests(PostAPITestCase):
+    """Tests the query budget middleware and view mixin."""
+
+    @override_settings(QUERY_BUDGET_HEADERS=True)
+    def test_headers_report_queries(self):
+        Post.objects.create(author=self.author, title='Counted', content='Body')
+        response = self.client.get(self.posts_url)
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertEqual(response['X-Query-Duplicates'], '0')
+        self.assertIn('X-Query-Time-Ms', response)
+
+    def test_headers_follow_debug_by_default(self):
+        # Tests run with DEBUG off, like production
+        self.assertNotIn('X-Query-Count', self.client.get(self.posts_url))
+
+    def test_overrun_fails_in_strict_mode(self):
+        with patch.object(PostViewSet, 'query_budget', {'list': 0}), \
+                self.assertLogs('social_media_api.querybudget', 'WARNING') as logs:
+            with self.assertRaisesRegex(QueryBudgetExceeded, 'ran 2 queries, budget is 0'):
+                self.client.get(self.posts_url)
+            # Outside tests an overrun is only logged (another URL, as the first response is cached)
+            with self.settings(QUERY_BUDGET_STRICT=False):
+                self.assertEqual(self.client.get(self.posts_url + '?page_size=5').status_code, 200)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(logs.records[0].query_budget, 0)
+
+    def test_recorder_groups_duplicate_statements(self):
+        posts = [Post.objects.create(author=self.author, title=str(i), content='Body') for i in range(3)]
+        recorder = QueryRecorder()
+        with recorder.record():
+            for post in Post.objects.filter(pk__in=[p.pk for p in posts]):
+                post.author.username  # the classic N+1
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.duplicates().values()), [3])
+
+
+class PostSearchTests(PostAPITestCase):
+    """Tests the full-text search filter, its index triggers and the ranked search endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.hiking = Post.objects.create(author=self.author, title='Mountain hiking', content='Trails and views')
+        self.cooking = Post.objects.create(author=self.author, title='Dinner', content='Cooking after hiking')
+        self.other = Post.objects.create(author=self.author, title='Gardening', content='Tomatoes')
+
+    def search_ids(self, query):
+        response = self.client.get(self.posts_url, {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['id'] for row in response.data['results']}
+
+    def test_search_filter_matches_all_terms_with_stemming(self):
+        self.assertEqual(self.search_ids('hiking'), {self.hiking.pk, self.cooking.pk})
+        self.assertEqual(self.search_ids('hike trails'), {self.hiking.pk})
+        self.assertEqual(self.search_ids('"unbalanced AND ('), set())
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.content = 'Hiking with tomatoes'
+        self.other.save()
+        self.assertIn(self.other.pk, self.search_ids('hiking'))
+
+        Post.objects.filter(pk=self.hiking.pk).update(title='Mountain biking')
+        self.hiking.delete()
+        self.assertEqual(self.search_ids('hiking'), {self.cooking.pk, self.other.pk})
+        self.assertEqual(self.search_ids('mountain'), set())
+
+    def test_ranked_search_prefers_title_matches_and_pages(self):
+        url = reverse('post_search')
+        response = self.client.get(url, {'q': 'hiking', 'page_size': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.hiking.pk])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [self.cooking.pk])
+        self.assertIsNone(response.data['next'])
+
+        self.assertEqual(self.client.get(url).data['results'], [])
+
+
+class BenchmarkSearchCommandTests(PostAPITestCase):
+    """Smoke test for the search benchmark command."""
+
+    def test_reports_both_engines(self):
+        out = StringIO()
+        call_command('benchmark_search', '--seed', '50', '--vocabulary', '100', '--repeat', '1',
+                     '--json', 'ba', stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index('{'):])
+        self.assertEqual(report['backend'], 'SQLiteSearchBackend')
+        self.assertEqual(report['posts'], 50)
+        self.assertIn('search_filter_ms', report['queries']['ba'])
+
+
+@override_settings(TASKS={'BACKEND': 'notifications.queue.ImmediateBackend'})
+class BenchmarkApiCommandTests(TransactionTestCase):
+    """
+    Smoke tests for the synthetic data generator and the API benchmark command.
+    The benchmark's client threads use their own connections, so data must be committed.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generator_keeps_counters_and_feeds_consistent(self):
+        created = SocialGraphGenerator(40, follows_per_user=5, posts_per_user=2, prefix='gen_').generate()
+        self.assertEqual(created['users'], 40)
+        self.assertEqual(reconcile_follow_counts(), 0)
+        self.assertEqual(reconcile_post_counters(), 0)
+        self.assertEqual(FeedEntry.objects.count(), created['feed_entries'])
+        self.assertGreater(created['feed_entries'], 0)
+        # The most popular user draws more followers than the average
+        counts = list(User.objects.filter(username__startswith='gen_').values_list('follower_count', flat=True))
+        self.assertGreater(max(counts), 2 * sum(counts) / len(counts))
+
+    def test_reports_latency_per_endpoint(self):
+        out = StringIO()
+        call_command('benchmark_api', '--seed', '30', '--requests', '5', '--warmup', '1', '--json', stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index('{'):])
+        self.assertEqual(report['target'], 'in-process')
+        self.assertEqual(set(report['endpoints']), {
+            'post_list', 'post_list_search', 'post_search', 'feed', 'like_toggle', 'notifications',
+            'post_list_async', 'feed_async', 'notifications_async',
+        })
+        for result in report['endpoints'].values():
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertIsNotNone(result['queries_mean'])
+
+    def test_rejects_an_empty_run(self):
+        with self.assertRaisesRegex(CommandError, '--requests'):
+            call_command('benchmark_api', '--requests', '0', stdout=StringIO())
+
+    def test_drives_the_asgi_application(self):
+        out = StringIO()
+        call_command('benchmark_api', '--seed', '30', '--requests', '6', '--warmup', '1', '--asgi',
+                     '--concurrency', '3', '--endpoint', 'feed', '--endpoint', 'feed_async', '--json', stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index('{'):])
+        self.assertEqual(report['transport'], 'asgi')
+        for result in report['endpoints'].values():
+            self.assertEqual(result['requests'], 6)
+            self.assertEqual(result['errors'], 0)
+            self.assertIsNotNone(result['queries_mean'])
+
+
+class SeedSocialCommandTests(PostAPITestCase):
+    """Tests the seed_social bulk data generator command."""
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command('seed_social', *args, '--json', stdout=out)
+        return json.loads(out.getvalue()[out.getvalue().index('{'):])['rows']
+
+    def test_users_share_one_usable_password(self):
+        rows = self.seed('20', '--password', 'secret123', '--prefix', 'seeded_')
+        self.assertEqual(rows['users'], 20)
+        users = User.objects.filter(username__startswith='seeded_')
+        self.assertEqual(users.values('password').distinct().count(), 1)
+        self.assertTrue(users.first().check_password('secret123'))
+        self.assertEqual(Notification.objects.filter(verb='followed').count(), rows['follows'])
+
+    def test_rerun_with_same_prefix_notifies_once_per_follow(self):
+        first = self.seed('20', '--prefix', 'again_')
+        second = self.seed('20', '--prefix', 'again_')
+        follows = Follow.objects.filter(to_customuser__username__startswith='again_').count()
+        self.assertEqual(follows, first['follows'] + second['follows'])
+        self.assertEqual(Notification.objects.filter(verb='followed').count(), follows)
+
+    def test_likes_repeated_across_batches_are_counted_and_notified_once(self):
+        rows = self.seed('10', '--posts-per-user', '1', '--likes-per-post', '10', '--batch-size', '5')
+        likes = Like.objects.filter(user__username__startswith='seed_')
+        self.assertEqual(rows['likes'], likes.count())
+        self.assertEqual(
+            Notification.objects.filter(verb='liked').count(),
+            likes.exclude(post__author=F('user')).count(),
+        )
+
+    def test_same_seed_gives_the_same_shape(self):
+        first = self.seed('25', '--prefix', 'a_', '--seed', '7')
+        second = self.seed('25', '--prefix', 'b_', '--seed', '7')
+        self.assertEqual({k: v for k, v in first.items() if k != 'feed_entries'},
+                         {k: v for k, v in second.items() if k != 'feed_entries'})
+
+
+class BenchmarkIndexesCommandTests(TransactionTestCase):
+    """Smoke test for the index benchmark command on a tiny seeded dataset."""
+
+    def test_reports_plans_with_and_without_indexes(self):
+        out = StringIO()
+        call_command(
+            'benchmark_indexes', '--seed', '200', '--users', '20', '--repeat', '2',
+            '--compare', '--json', stdout=out,
+        )
+        report = json.loads(out.getvalue()[out.getvalue().index('{'):])
+        self.assertEqual(report['rows']['notifications'], 200)
+        page = report['queries']['notification_page']
+        self.assertIn('notif_recipient_ts_idx', page['plan'])
+        self.assertNotIn('notif_recipient_ts_idx', page['plan_without_indexes'])
@@ -0,0 +1,173 @@
+# posts/trending.py
+
+import bisect
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import DateTimeField, F, FloatField, Func, Sum, Value
+from django.db.models.functions import Power
+
+# Seconds for an event's contribution to a post's score to halve
+HALF_LIFE = getattr(settings, 'POSTS_TRENDING_HALF_LIFE', 6 * 3600)
+
+# Score added per event, before decay
+EVENT_WEIGHTS = getattr(settings, 'POSTS_TRENDING_WEIGHTS', {'like': 1.0, 'comment': 2.0})
+
+# Most posts served by the trending endpoint
+TRENDING_SIZE = getattr(settings, 'POSTS_TRENDING_SIZE', 50)
+
+# Posts scored in memory; the lowest are dropped beyond this
+MAX_TRACKED = getattr(settings, 'POSTS_TRENDING_MAX_TRACKED', 10000)
+
+# How far back the warm-up replays events; older ones have decayed below 1/16
+WARM_UP_HALF_LIVES = 4
+
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) without leaving log space."""
+    hi, lo = (a, b) if a >= b else (b, a)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+class SecondsAfter(Func):
+    """Seconds from the datetime `since` to a datetime column, as a float."""
+    template = 'EXTRACT(EPOCH FROM (%(expressions)s))'
+    arg_joiner = ' - '
+    output_field = FloatField()
+
+    def __init__(self, field, since):
+        super().__init__(F(field), Value(since, output_field=DateTimeField()))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Native julianday() instead of Django's Python timestamp difference, per row
+        return self.as_sql(
+            compiler, connection, template='((julianday(%(expressions)s)) * 86400.0)',
+            arg_joiner=') - julianday(', **extra_context,
+        )
+
+
+class TrendingTracker:
+    """
+    Time-decayed engagement scores per post, kept in memory and updated one
+    event at a time.
+
+    A post's score is the sum of weight * 2 ** -(age / half_life) over its
+    events. Every score decays at the same rate, so instead of decaying the
+    stored scores the tracker grows new events: an event at time t stores
+    weight * 2 ** (t / half_life), which never changes and ranks posts the
+    same way. Those values overflow a float, so they are kept as natural logs
+    and summed with log_add.
+
+    Scores live in a dict and in a list kept sorted by (log_score, post_id):
+    an event is one bisect removal and one insort, and top(k) slices the tail
+    of the list. Past max_tracked posts the lowest one is dropped; if it gets
+    another event it starts again from that event alone.
+
+    Events are recorded live from the moment the tracker is created. Older
+    ones are loaded from the Like and Comment tables on the first top() call
+    in the process, so a restart does not empty the ranking: the database
+    sums each post's decayed events and returns only the max_tracked best
+    posts per table.
+    """
+
+    def __init__(self, half_life=HALF_LIFE, max_tracked=MAX_TRACKED):
+        self.rate = math.log(2) / half_life
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._warm_up_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._scores = {}
+            self._ranked = []
+            self._started = time.time()
+            self._warmed = False
+
+    def record(self, post_id, event, at=None):
+        """
+        Adds one 'like' or 'comment' event to the post's score. `at` is the
+        event's Unix time (defaults to now).
+        """
+        at = time.time() if at is None else at
+        value = math.log(EVENT_WEIGHTS[event]) + self.rate * at
+        with self._lock:
+            self._add(post_id, value)
+
+    def _add(self, post_id, value):
+        previous = self._scores.get(post_id)
+        if previous is not None:
+            del self._ranked[bisect.bisect_left(self._ranked, (previous, post_id))]
+            value = log_add(previous, value)
+        self._scores[post_id] = value
+        bisect.insort(self._ranked, (value, post_id))
+        if len(self._ranked) > self.max_tracked:
+            _, dropped = self._ranked.pop(0)
+            del self._scores[dropped]
+
+    def remove(self, post_id):
+        with self._lock:
+            previous = self._scores.pop(post_id, None)
+            if previous is not None:
+                del self._ranked[bisect.bisect_left(self._ranked, (previous, post_id))]
+
+    def top(self, k):
+        """
+        Returns up to k (post_id, score) pairs, highest first, where score is
+        the decayed engagement score as of now.
+        """
+        self.warm_up()
+        now_value = self.rate * time.time()
+        with self._lock:
+            tail = self._ranked[-k:] if k > 0 else []
+        return [(post_id, math.exp(value - now_value)) for value, post_id in reversed(tail)]
+
+    def warm_up(self):
+        """Loads scores for likes and comments from before the tracker started, once."""
+        if self._warmed:
+            return
+        # One thread loads; live events keep being recorded meanwhile
+        with self._warm_up_lock:
+            if self._warmed:
+                return
+            earlier = self.load_earlier_scores()
+            with self._lock:
+                for post_id, value in self._scores.items():
+                    earlier[post_id] = log_add(earlier[post_id], value) if post_id in earlier else value
+                ranked = sorted((value, post_id) for post_id, value in earlier.items())[-self.max_tracked:]
+                self._ranked = ranked
+                self._scores = {post_id: value for value, post_id in ranked}
+                self._warmed = True
+
+    def load_earlier_scores(self):
+        """
+        {post_id: log score} of events in the WARM_UP_HALF_LIVES before the
+        tracker started, summed per post in SQL. Exponents are taken from the
+        window start, so the sums stay small, and shifted back into the
+        tracker's log space.
+        """
+        from .models import Comment, Like
+
+        until = datetime.fromtimestamp(self._started, tz=dt_timezone.utc)
+        since = until - timedelta(seconds=self.half_life * WARM_UP_HALF_LIVES)
+        shift = self.rate * since.timestamp()
+        scores = {}
+        for event, model in (('like', Like), ('comment', Comment)):
+            growth = Power(Value(2.0), SecondsAfter('created_at', since) / Value(float(self.half_life)))
+            rows = (
+                model.objects.filter(created_at__gte=since, created_at__lt=until)
+                .values('post_id').annotate(total=Sum(growth, output_field=FloatField()))
+                .order_by('-total').values_list('post_id', 'total')[:self.max_tracked]
+            )
+            weight = EVENT_WEIGHTS[event]
+            for post_id, total in rows:
+                value = math.log(weight * total) + shift
+                scores[post_id] = log_add(scores[post_id], value) if post_id in scores else value
+        return scores
+
+
+trending = TrendingTracker()
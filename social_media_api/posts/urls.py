@@ -2,37 +2,36 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet
+from .views import (
+    PostViewSet, CommentViewSet, UserFeedView, LikePostView, PostSearchView, TrendingPostsView,
+    post_list_async, user_feed_async,
+)
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 
 # Manually define comment routes, assuming PostViewSet uses lookup='pk'
 urlpatterns = [
-    path('', include(router.urls)),
-    
-    # List and Create comments for a specific post
-    path('feed/', UserFeedView.as_view(), name='user_feed'), # <-- ADDED
-    path('posts/<int:post_pk>/comments/', CommentViewSet.as_view({'get': 'list', 'post': 'create'}), name='post-comments-list'),
-    
-    # Retrieve, Update, Destroy a specific comment
-    path('posts/<int:post_pk>/comments/<int:pk>/', CommentViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name='post-comments-detail'),
-]
-# posts/urls.py (Update)
+    path('feed/', UserFeedView.as_view(), name='user_feed'),
+    path('feed/async/', user_feed_async, name='user_feed_async'),
 
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, UserFeedView, LikePostView # <--- Import LikePostView
-# ...
+    # Ranked full-text search and trending posts (must precede the router's posts/<pk>/ route)
+    path('posts/search/', PostSearchView.as_view(), name='post_search'),
+    path('posts/trending/', TrendingPostsView.as_view(), name='post_trending'),
 
-urlpatterns = [
-    path('feed/', UserFeedView.as_view(), name='user_feed'), 
+    # Async versions of the post list and feed (serve via ASGI)
+    path('posts/async/', post_list_async, name='post_list_async'),
 
-    # New Like/Unlike Route (Toggles like status)
+    # Like/Unlike Route (Toggles like status)
     # The 'unlike' functionality is built into the POST method of LikePostView
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='post_like_toggle'),
 
-    # Existing Post and Comment Routes "<int:pk>/unlike/"
-    path('', include(router.urls)), 
-    # ... nested comment routes ...
-]
\ No newline at end of file
+    # List and Create comments for a specific post
+    path('posts/<int:post_pk>/comments/', CommentViewSet.as_view({'get': 'list', 'post': 'create'}), name='post-comments-list'),
+
+    # Retrieve, Update, Destroy a specific comment
+    path('posts/<int:post_pk>/comments/<int:pk>/', CommentViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}), name='post-comments-detail'),
+
+    # Existing Post Routes
+    path('', include(router.urls)),
+]
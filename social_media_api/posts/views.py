@@ -1,48 +1,154 @@
 # posts/views.py
 
-from rest_framework import viewsets
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.generics import ListAPIView
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import JsonResponse
 from .models import Post, Comment
-from .serializers import PostSerializer, CommentSerializer
+from .serializers import PostSerializer, PostDetailSerializer, CommentSerializer, TrendingPostSerializer
 from .permissions import IsAuthorOrReadOnly
-from rest_framework.generics import ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from .feed import fan_out_post, get_feed
+from .counters import adjust_post_counter
+from .likes import like_buffer
+from .search import FullTextSearchFilter, get_search_backend
+from .trending import TRENDING_SIZE, trending
+from .caching import CachedListMixin, POST_LIST, comments_scope
+from social_media_api.asyncviews import async_read_view
+from social_media_api.pagination import KeysetPagination
+from social_media_api.querybudget import QueryBudgetMixin
 
 # --- Custom Pagination ---
 
-class StandardResultsPagination(PageNumberPagination):
+class StandardResultsPagination(KeysetPagination):
+    # Keyset pagination on (created_at, id): opaque ?cursor=, ?count=false skips the count
+    ordering = ('-created_at', '-id')
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class FeedPagination(StandardResultsPagination):
+    """
+    Pages a Feed (posts/feed.py): each of its ranges is read with the cursor
+    applied and limited to a page, then the ranges are merged. Cursors hold
+    the post's (created_at, id), like the post list's.
+    """
+
+    def paginate_queryset(self, feed, request, view=None):
+        _, cursor = self.prepare(feed, request)
+        self.count = feed.count() if self.wants_count(request) else None
+        posts, bound = {}, None
+        for queryset, ordering, to_post in feed.parts():
+            rows = list(self.range_queryset(queryset, cursor, ordering, bound))
+            bound = self.collect(posts, rows, to_post, bound)
+        return self.merge(posts, cursor)
+
+    async def apaginate_queryset(self, feed, request, view=None):
+        """paginate_queryset() for async views, through acount() and aiterator()."""
+        _, cursor = self.prepare(feed, request)
+        self.count = await feed.acount() if self.wants_count(request) else None
+        posts, bound = {}, None
+        for queryset, ordering, to_post in feed.parts():
+            queryset = self.range_queryset(queryset, cursor, ordering, bound)
+            rows = [row async for row in queryset.aiterator(chunk_size=self.page_size + 1)]
+            bound = self.collect(posts, rows, to_post, bound)
+        return self.merge(posts, cursor)
+
+    def range_queryset(self, queryset, cursor, ordering, bound):
+        if bound is not None:
+            # Rows beyond an earlier range's full page cannot make this page,
+            # so later ranges (the pulled authors' IN list) sort a narrow window
+            lookup = 'lte' if self.is_reverse else 'gte'
+            queryset = queryset.filter(**{f'{ordering[0].lstrip("-")}__{lookup}': bound})
+        return self.page_queryset(queryset, cursor, ordering)
+
+    def collect(self, posts, rows, to_post, bound):
+        """Adds a range's rows to posts by pk; returns the bound for later ranges."""
+        for row in rows:
+            post = to_post(row)
+            posts[post.pk] = post
+        if len(rows) > self.page_size:
+            return to_post(rows[-1]).created_at
+        return bound
+
+    def merge(self, posts, cursor):
+        # The newest page_size + 1 of the union are within each range's first page_size + 1
+        rows = sorted(posts.values(), key=attrgetter('created_at', 'pk'), reverse=not self.is_reverse)
+        return self.finish_page(rows[:self.page_size + 1], cursor)
+
+class SearchRankPagination(KeysetPagination):
+    # Keyset pagination on (search_rank, id): best matches first
+    ordering = ('-search_rank', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+    def parse_cursor_value(self, model, name, value):
+        if name == 'search_rank':
+            return float(value)
+        return super().parse_cursor_value(model, name, value)
+
+# Number of comments embedded in a post detail response
+RECENT_COMMENTS_LIMIT = 10
+
 # --- Post ViewSet ---
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class PostViewSet(QueryBudgetMixin, CachedListMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsPagination
+    # Token lookup + page (+ count unless ?count=false); detail: token + post + recent comments
+    query_budget = {'list': 3, 'retrieve': 3}
     
-    # Filtering and Searching
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    # Filtering and Searching (?search= goes through the full-text index, see posts/search.py)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['author__username', 'created_at']
-    search_fields = ['title', 'content'] # Fields to search against
     
+    def get_serializer_class(self):
+        # Only the detail view embeds comments; lists stay flat
+        if self.action == 'retrieve':
+            return PostDetailSerializer
+        return PostSerializer
+
+    def get_cache_scopes(self):
+        return [POST_LIST]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            recent_comments = Comment.objects.select_related('author').order_by('-created_at', '-id')
+            queryset = queryset.prefetch_related(Prefetch(
+                'comments',
+                queryset=recent_comments[:RECENT_COMMENTS_LIMIT],
+                to_attr='recent_comments',
+            ))
+        return queryset
+
     # Logic to automatically set the author to the currently logged-in user
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+
+        # Push the new post into each follower's materialized feed
+        fan_out_post(post)
 
 # --- Comment ViewSet ---
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all()
+class CommentViewSet(QueryBudgetMixin, CachedListMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    query_budget = {'list': 2, 'retrieve': 2}
     
-    # No pagination on comments, Post.objects.filter(author__in=following_users).order_by", "permissions.IsAuthenticated but we should restrict comments to a specific post
+    # No pagination on comments, but we should restrict comments to a specific post
     # We will filter the queryset based on the URL provided in the router setup
     
     # Set the author and post automatically
@@ -51,8 +157,20 @@ class CommentViewSet(viewsets.ModelViewSet):
         post_pk = self.kwargs.get('post_pk')
         post = Post.objects.get(pk=post_pk)
         
-        # Save the comment with the current user as author and the post from the URL
-        serializer.save(author=self.request.user, post=post)
+        # Save the comment with the current user as author and the post from the URL,
+        # bumping the post's denormalized comment counter in the same transaction
+        with transaction.atomic():
+            serializer.save(author=self.request.user, post=post)
+            adjust_post_counter(post.pk, 'comment_count', 1)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            post_id = instance.post_id
+            instance.delete()
+            adjust_post_counter(post_id, 'comment_count', -1)
+
+    def get_cache_scopes(self):
+        return [comments_scope(self.kwargs.get('post_pk'))]
 
     # Override get_queryset to filter comments by post_pk from the URL
     def get_queryset(self):
@@ -61,69 +179,111 @@ class CommentViewSet(viewsets.ModelViewSet):
             return self.queryset.filter(post__pk=post_pk)
         return self.queryset
 
-class UserFeedView(ListAPIView):
+class UserFeedView(QueryBudgetMixin, ListAPIView):
     """
     Returns a list of posts from all users that the current user is following,
     ordered by creation date (newest first).
     """
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsPagination # Reuse existing pagination
+    pagination_class = FeedPagination
+    # Token lookup + following set (on a cache miss) + pulled authors + feed
+    # entries page + pulled posts page (+ count unless ?count=false)
+    query_budget = 6
 
     def get_queryset(self):
-        user = self.request.user
-        
-        # 1. Get the list of users the current user is following (a QuerySet of CustomUser objects)
-        following_users = user.following.all()
-        
-        # 2. Filter posts to include only those where the author is in the 'following_users' list
-        # We also use .select_related('author') to optimize database queries.
-        queryset = Post.objects.filter(
-            author__in=following_users
-        ).select_related('author').order_by('-created_at')
-        
-        return queryset
-    # posts/views.py (Add to existing content)
+        # Served from the materialized feed (FeedEntry) instead of
+        # recomputing author__in=following on every request
+        return get_feed(self.request.user)
 
-# ... Existing imports ...
-from rest_framework.decorators import action
-from django.shortcuts import get_object_or_404
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import Post, Comment, Like # <--- Import Like model
-# ...
+class PostSearchView(QueryBudgetMixin, ListAPIView):
+    """
+    Ranked full-text search over post titles and content: /api/posts/search/?q=...
+    Title matches weigh more than content matches.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = SearchRankPagination
+    query_budget = 3
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        return get_search_backend().search(Post.objects.select_related('author'), query)
+
+class TrendingPostsView(QueryBudgetMixin, APIView):
+    """
+    Posts with the most recent like and comment activity: /api/posts/trending/?limit=N.
+    The ranking is held in memory (posts/trending.py), so a request only loads
+    the top N posts by primary key.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    # Token lookup + posts; a process's first request also replays recent likes and comments
+    query_budget = 4
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', TRENDING_SIZE))
+        except ValueError:
+            limit = TRENDING_SIZE
+        limit = min(max(limit, 1), TRENDING_SIZE)
+
+        ranked = trending.top(limit)
+        posts = Post.objects.select_related('author').in_bulk([post_id for post_id, _ in ranked])
+        results = []
+        for post_id, score in ranked:
+            # Deleted posts are dropped from the ranking after commit
+            post = posts.get(post_id)
+            if post is not None:
+                post.trending_score = score
+                results.append(post)
+        serializer = TrendingPostSerializer(results, many=True, context={'request': request})
+        return Response({'results': serializer.data})
+
+# --- Async read views (serve via ASGI, see social_media_api/asyncviews.py) ---
+
+async def paginated_posts(request, queryset, paginator):
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = PostSerializer(page, many=True, context={'request': request})
+    return JsonResponse(paginator.get_paginated_data(serializer.data))
+
+@async_read_view(query_budget=3, login_required=False)
+async def post_list_async(request):
+    """
+    The post list (with ?search=) as an async view: same pages and cursors as
+    /api/posts/, read with the async ORM. Not served from the list cache.
+    """
+    queryset = Post.objects.select_related('author')
+    # Same filters as PostViewSet: ?author__username=, ?created_at= and ?search=
+    view = PostViewSet(request=request, format_kwarg=None)
+    for backend in PostViewSet.filter_backends:
+        queryset = backend().filter_queryset(request, queryset, view)
+    return await paginated_posts(request, queryset, StandardResultsPagination())
+
+@async_read_view(query_budget=6)
+async def user_feed_async(request):
+    """The current user's feed as an async view, same pages as /api/feed/."""
+    # Resolving the following set may hit the database, so run it on a thread
+    feed = await sync_to_async(get_feed)(request.user)
+    return await paginated_posts(request, feed, FeedPagination())
 
 # --- Like/Unlike Views ---
 
 class LikePostView(APIView):
+    """
+    Toggles the current user's like on a post.
+
+    The toggle is recorded in the write-behind like buffer (posts/likes.py) and
+    written to the database in batches, so the response only needs the post
+    lookup and, for pairs not already buffered, one exists() check.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        user = request.user
-
-        # 1. Check if the user already liked the post
-        if Like.objects.filter(post=post, user=user).exists():
-            # If exists, treat this as an 'unlike' action (toggle behavior)
-            Like.objects.filter(post=post, user=user).delete()
-            
-            # Optionally delete the notification if it exists (complex, so skipping for simplicity)
-            
-            return Response({"detail": "Post unliked."}, status=status.HTTP_200_OK)
-
-        # 2. Create the Like object
-        Like.objects.create(post=post, user=user)
-        
-        # 3. Generate Notification (if user is not liking their own post) "generics.get_object_or_404(Post, pk=pk)", "Like.objects.get_or_create(user=request.user, post=post)", "Notification.objects.create"
-        if post.author != user:
-            from notifications.tasks import create_notification_async
-            # Call a utility function to create the notification
-            create_notification_async(
-                recipient=post.author,
-                actor=user,
-                verb='liked',
-                target=post
-            )
-
-        return Response({"detail": "Post liked."}, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        post = get_object_or_404(Post.objects.only('pk'), pk=pk)
+
+        # Flip the like state; notifications for new likes are sent when the buffer flushes
+        liked = like_buffer.toggle(post.pk, request.user.pk)
+
+        if not liked:
+            return Response({"detail": "Post unliked.", "liked": False}, status=status.HTTP_200_OK)
+        return Response({"detail": "Post liked.", "liked": True}, status=status.HTTP_201_CREATED)
@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
+# Serves the whole API; long-lived endpoints such as the notification
+# stream (/api/notifications/stream/) and the async read views (posts/async/,
+# feed/async/, notifications/async/) should be deployed behind this entry point
 application = get_asgi_application()
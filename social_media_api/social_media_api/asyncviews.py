@@ -0,0 +1,43 @@
+# social_media_api/asyncviews.py
+
+import functools
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from accounts.authentication import CachedTokenAuthentication, aauthenticate_token
+
+
+def async_read_view(query_budget=None, login_required=True):
+    """
+    Turns an async function into a GET-only JSON API view. DRF views are
+    sync only, so under ASGI every DRF request holds a worker thread; these
+    views await the ORM instead (acount(), aiterator()).
+
+    The wrapper authenticates the token like CachedTokenAuthentication, sets
+    the budget for QueryBudgetMiddleware and renders API exceptions (bad
+    cursor, bad token) the way DRF does. The view receives a DRF Request,
+    for query_params, with request.user set.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request.query_budget = query_budget
+            try:
+                if request.method != 'GET':
+                    raise exceptions.MethodNotAllowed(request.method)
+                user = await aauthenticate_token(request)
+                if user is None and login_required:
+                    raise exceptions.NotAuthenticated()
+                api_request = Request(request)
+                api_request.user = user or AnonymousUser()
+                return await view(api_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+                if exc.status_code == 401:
+                    response['WWW-Authenticate'] = CachedTokenAuthentication().authenticate_header(request)
+                return response
+        return wrapper
+    return decorator
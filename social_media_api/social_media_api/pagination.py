@@ -0,0 +1,185 @@
+# social_media_api/pagination.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over a unique (timestamp, id) ordering.
+
+    Each page is fetched with a WHERE on the last row seen instead of OFFSET,
+    so page N costs the same as page 1 and rows inserted while a client is
+    scrolling never shift items between pages. The total count is returned
+    by default; clients that don't need it skip the COUNT with ?count=false.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    # Both fields descending; the last one must be unique (normally 'id')
+    ordering = ('-created_at', '-id')
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.prepare(queryset, request)
+        self.count = queryset.count() if self.wants_count(request) else None
+        # Fetch one extra row to find out whether another page follows
+        rows = list(self.page_queryset(queryset, cursor))
+        return self.finish_page(rows, cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, through acount() and aiterator()."""
+        queryset, cursor = self.prepare(queryset, request)
+        self.count = await queryset.acount() if self.wants_count(request) else None
+        rows = [row async for row in self.page_queryset(queryset, cursor).aiterator(chunk_size=self.page_size + 1)]
+        return self.finish_page(rows, cursor)
+
+    def prepare(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+        self.is_reverse = bool(cursor and cursor['reverse'])
+        return queryset, cursor
+
+    def page_queryset(self, queryset, cursor, ordering=None):
+        """
+        One page (plus a row) of the queryset after the cursor. `ordering`
+        names the columns holding the cursor's values when they differ from
+        self.ordering, e.g. on another model.
+        """
+        ordering = ordering or self.ordering
+        if cursor is not None:
+            queryset = queryset.filter(self.get_cursor_filter(cursor, ordering))
+
+        if self.is_reverse:
+            ordering = [self.invert(field) for field in ordering]
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def finish_page(self, rows, cursor):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.is_reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return payload
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # --- Helpers ---
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false', 'no')
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_cursor_filter(self, cursor, ordering=None):
+        """
+        Builds (a < x) OR (a = x AND b < y) for the ordering fields, flipping
+        the comparisons when walking backwards.
+        """
+        ordering = ordering or self.ordering
+        (first, second) = [field.lstrip('-') for field in ordering]
+        descending = ordering[0].startswith('-') != cursor['reverse']
+        lookup = 'lt' if descending else 'gt'
+        return (
+            Q(**{f'{first}__{lookup}': cursor['value']})
+            | Q(**{first: cursor['value'], f'{second}__{lookup}': cursor['pk']})
+        )
+
+    def encode_cursor(self, row, reverse):
+        (first, second) = [field.lstrip('-') for field in self.ordering]
+        value = getattr(row, first)
+        position = {
+            'v': value.isoformat() if hasattr(value, 'isoformat') else value,
+            'pk': getattr(row, second),
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        (first, second) = [field.lstrip('-') for field in self.ordering]
+        try:
+            position = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            return {
+                'value': self.parse_cursor_value(model, first, position['v']),
+                'pk': self.parse_cursor_value(model, second, position['pk']),
+                'reverse': bool(position.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_cursor_value(self, model, name, value):
+        # Override for orderings on annotations rather than model fields
+        return model._meta.get_field(name).to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # An empty backwards page: restart from the top
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -0,0 +1,33 @@
+# social_media_api/processes.py
+
+import pickle
+
+import django
+
+# Object unpickled by init_worker in this process
+_target = None
+
+
+def init_django_worker():
+    """
+    ProcessPoolExecutor initializer for spawned workers, which start from a
+    clean interpreter and need their own settings and app registry.
+    """
+    django.setup()
+
+
+def init_worker(payload):
+    """
+    init_django_worker() that also unpickles an object for call_target().
+    The payload is unpickled only after django.setup(), so it may reference
+    models, which a plain initargs object could not: it would be unpickled first.
+    """
+    global _target
+    init_django_worker()
+    _target = pickle.loads(payload)
+
+
+def call_target(call):
+    """Runs (method name, *args) on the worker's unpickled object."""
+    name, *args = call
+    return getattr(_target, name)(*args)
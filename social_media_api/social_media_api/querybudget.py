@@ -0,0 +1,173 @@
+# social_media_api/querybudget.py
+
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+logger = logging.getLogger(__name__)
+
+# SQL signatures included in logs and error messages
+MAX_REPORTED_DUPLICATES = 5
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode (tests) when a view runs more queries than its budget."""
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper hook that records (sql, seconds) for every query.
+    Works with DEBUG off, unlike connection.queries.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(seconds for _, seconds in self.queries) * 1000
+
+    def duplicates(self):
+        """
+        {sql: executions} for statements run more than once. The SQL still has
+        its parameter placeholders, so a loop of single-row lookups (an N+1)
+        shows up as one signature with a high count.
+        """
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: n for sql, n in counts.most_common() if n > 1}
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the queries each request runs and reports them as response headers
+    (X-Query-Count, X-Query-Time-Ms, X-Query-Duplicates, when
+    QUERY_BUDGET_HEADERS is on) and as one structured log record.
+
+    Views declare a budget with QueryBudgetMixin (async views set
+    request.query_budget themselves). An overrun is logged as a
+    warning and, with QUERY_BUDGET_STRICT (set by QueryBudgetTestRunner),
+    raises QueryBudgetExceeded so the test that made the request fails.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Stay async under ASGI, so async views are not pushed onto a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        # The ORM runs async views' queries (and sync views) on the request's
+        # thread-sensitive executor thread, whose connections are not the
+        # event loop's; install the wrappers from that thread
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(recorder.record())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        duplicates = recorder.duplicates()
+        duplicate_count = sum(n - 1 for n in duplicates.values())
+        budget = getattr(request, 'query_budget', None)
+        over_budget = budget is not None and recorder.count > budget
+
+        if getattr(settings, 'QUERY_BUDGET_HEADERS', False):
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f'{recorder.total_ms:.2f}'
+            response['X-Query-Duplicates'] = str(duplicate_count)
+
+        top_duplicates = dict(list(duplicates.items())[:MAX_REPORTED_DUPLICATES])
+        logger.log(
+            logging.WARNING if over_budget else logging.DEBUG,
+            '%s %s ran %d queries in %.2f ms (%d duplicates, budget %s)',
+            request.method, request.path, recorder.count, recorder.total_ms, duplicate_count, budget,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'query_count': recorder.count,
+                'query_time_ms': round(recorder.total_ms, 2),
+                'duplicate_queries': duplicate_count,
+                'duplicate_signatures': top_duplicates,
+                'query_budget': budget,
+            },
+        )
+
+        if over_budget and getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            lines = [f'{request.method} {request.path} ran {recorder.count} queries, budget is {budget}.']
+            lines += [f'  {n}x {sql}' for sql, n in top_duplicates.items()]
+            raise QueryBudgetExceeded('\n'.join(lines))
+        return response
+
+
+class QueryBudgetMixin:
+    """
+    DRF view mixin declaring the most queries a request to the view may run,
+    authentication included: an int, or a dict of budgets per viewset action
+    (or per lowercase HTTP method for plain views). Actions missing from the
+    dict are unbudgeted. Enforced by QueryBudgetMiddleware.
+    """
+    query_budget = None
+
+    def get_query_budget(self):
+        budget = self.query_budget
+        if isinstance(budget, dict):
+            return budget.get(getattr(self, 'action', None) or self.request.method.lower())
+        return budget
+
+    def initial(self, request, *args, **kwargs):
+        # The middleware only sees the Django request
+        request._request.query_budget = self.get_query_budget()
+        super().initial(request, *args, **kwargs)
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Test runner that turns query budget overruns into test failures."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
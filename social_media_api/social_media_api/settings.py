@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so it counts the queries of every other middleware too
+    'social_media_api.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -135,9 +137,122 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 # Django REST Framework settings (optional, but good practice)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    )
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Login attempts per username (accounts/throttles.py)
+        'login_username': '10/min',
+    },
+}
+
+# Home feed (posts/feed.py)
+# Authors above this follower count are merged into feeds at read time instead of fanned out on write
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+# Number of recent posts copied into a follower's feed when they follow someone
+FEED_BACKFILL_LIMIT = 50
+# Newest entries kept per materialized feed, and how often (in fan-outs) a follower's feed is trimmed back
+FEED_MAX_ENTRIES = 1000
+FEED_TRIM_INTERVAL = 50
+
+# Like write-behind buffer (posts/likes.py)
+# Pending toggles are flushed once this many are buffered or the oldest is this many seconds old
+LIKE_BUFFER_MAX_PENDING = 500
+LIKE_BUFFER_FLUSH_INTERVAL = 2.0
+# Flush from a background thread too, so toggles are written when no request comes in
+LIKE_BUFFER_BACKGROUND_FLUSH = True
+
+# Background tasks (notifications/queue.py)
+# Backends: ImmediateBackend (inline), ThreadPoolBackend, ProcessPoolBackend,
+# DatabaseBackend (run workers with `python manage.py run_task_worker`)
+TASKS = {
+    'BACKEND': 'notifications.queue.ThreadPoolBackend',
+    'OPTIONS': {
+        'max_workers': 4,
+    },
+}
+
+# Notification aggregation (notifications/aggregation.py)
+# Repeated actions on the same target within this many seconds are folded into one notification
+NOTIFICATION_COALESCE_WINDOW = 3600
+# Number of recent actors kept on an aggregated notification
+NOTIFICATION_RECENT_ACTORS = 5
+
+# Cache (unread notification counters and other hot lookups)
+# Use a shared backend (e.g. Redis or Memcached) when running more than one process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'social-media-api',
+    }
 }
+
+# Notification push (notifications/pubsub.py)
+# InMemoryBroker only reaches streams served by the same process
+NOTIFICATIONS_PUBSUB = {
+    'BACKEND': 'notifications.pubsub.InMemoryBroker',
+}
+
+# Maximum users per batch follow/unfollow request or follow-status lookup
+BULK_FOLLOW_MAX_USERS = 100
+
+# Cached follow graph (accounts/graph.py)
+# Seconds a cached following/followers id set lives before it is rebuilt from the join table
+FOLLOW_GRAPH_CACHE_TIMEOUT = 24 * 3600
+# Id sets larger than this are read from the database instead (they would not fit a cache value)
+FOLLOW_GRAPH_CACHE_MAX_IDS = 100000
+
+# Token authentication cache (accounts/authentication.py)
+# Per-process LRU size and how long (seconds) an entry is trusted before re-checking the shared cache
+TOKEN_AUTH_LRU_SIZE = 1024
+TOKEN_AUTH_LRU_TIMEOUT = 10
+# Seconds a token -> user entry lives in the shared cache
+TOKEN_AUTH_CACHE_TIMEOUT = 300
+
+# Password hashing (accounts/hashing.py)
+PASSWORD_HASHERS = [
+    'accounts.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# PBKDF2 cost for new hashes; stored hashes with another count are re-encoded on login
+PASSWORD_PBKDF2_ITERATIONS = 1000000
+# Login hashing pool: worker processes (None = one per core, 0 = hash inline) and
+# how many logins may be queued or hashing at once before new ones get a 503
+LOGIN_HASH_WORKERS = None
+LOGIN_HASH_MAX_PENDING = None
+
+# Post search (posts/search.py)
+# Dotted path of the search backend; None picks FTS5 on SQLite and tsvector on PostgreSQL
+POSTS_SEARCH_BACKEND = None
+
+# Cached post/comment list responses with ETag/Last-Modified (posts/caching.py)
+POSTS_RESPONSE_CACHE_TIMEOUT = 300
+
+# SQL query budgets (social_media_api/querybudget.py)
+# Report X-Query-Count / X-Query-Time-Ms / X-Query-Duplicates response headers (development only)
+QUERY_BUDGET_HEADERS = DEBUG
+# Raise when a view exceeds its declared budget; the test runner turns this on
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'social_media_api.querybudget.QueryBudgetTestRunner'
+
+# Unread notification counters (notifications/counters.py)
+# Seconds a cached unread count lives before it is rebuilt from the database
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 300
+
+# Notification retention (notifications/retention.py)
+# Read notifications older than this many days are moved to the archive table by archive_notifications
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Trending posts (posts/trending.py)
+# Scores are kept per process; each process replays recent likes and comments on its first request
+# Seconds for a like or comment's weight to halve, and the weight of each event
+POSTS_TRENDING_HALF_LIFE = 6 * 3600
+POSTS_TRENDING_WEIGHTS = {'like': 1.0, 'comment': 2.0}
+# Posts served by /api/posts/trending/, and posts scored in memory
+POSTS_TRENDING_SIZE = 50
+POSTS_TRENDING_MAX_TRACKED = 10000
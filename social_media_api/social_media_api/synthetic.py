@@ -0,0 +1,308 @@
+# social_media_api/synthetic.py
+
+import bisect
+import itertools
+import multiprocessing
+import pickle
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.counters import reconcile_follow_counts
+from accounts.graph import Follow
+from notifications.models import Notification
+from posts.counters import reconcile_post_counters
+from posts.feed import FANOUT_MAX_FOLLOWERS
+from posts.models import Post, Comment, Like, FeedEntry
+from .processes import call_target, init_worker
+
+User = get_user_model()
+
+# Popularity of the i-th generated user is 1 / (i + 1) ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.0
+
+WORDS = (
+    'coffee morning city river music game launch travel photo weekend recipe code '
+    'garden design book movie team match release update idea story night summer'
+).split()
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """
+    Lets bulk_create store the given auto_now_add fields as set on the
+    instances, so generated rows can be spread over time.
+    """
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+def prepare_connection():
+    # Bulk loading: don't wait for SQLite to fsync every batch (only settable outside a transaction)
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+
+
+class SocialGraphGenerator:
+    """
+    Writes a synthetic social network with bulk_create in batches, for
+    benchmarks and local reproduction of production-sized tables.
+
+    Every generated user gets a Zipf popularity weight. Follow targets are
+    drawn by those weights, and so are liked and commented posts by their
+    author's, so follower counts and engagement follow a power law: a few
+    celebrities and a long tail. Authors are drawn uniformly. Rows are
+    spread over the last `days` days. Denormalized counters are reconciled
+    and FeedEntry rows are materialized the way fan_out_post writes them.
+
+    Each table is written as independent batches seeded from (seed, table,
+    batch), so the output is reproducible and batches can run on `workers`
+    spawned processes (not on SQLite, which has a single writer). Users
+    share one password hash computed up front. The state batches need (user
+    and post IDs, weights) is kept in arrays, about 8 bytes per value, so
+    millions of rows fit in memory.
+    """
+
+    def __init__(self, users, follows_per_user=20, posts_per_user=5, likes_per_post=5,
+                 comments_per_post=1, days=30, prefix='synthetic_', password=None, seed=0,
+                 batch_size=5000, workers=1, log=None):
+        self.users = users
+        self.follows_per_user = follows_per_user
+        self.posts_per_user = posts_per_user
+        self.likes_per_post = likes_per_post
+        self.comments_per_post = comments_per_post
+        self.days = days
+        self.prefix = prefix
+        self.password = password
+        self.seed = seed
+        self.batch_size = batch_size
+        self.workers = workers
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def __getstate__(self):
+        # Sent to worker processes; the log callback stays in the parent
+        state = self.__dict__.copy()
+        state['log'] = None
+        return state
+
+    def generate(self):
+        """Writes every table in dependency order and returns the rows written per table."""
+        if self.workers > 1 and connection.vendor == 'sqlite':
+            self.log('SQLite allows one writer at a time; writing batches in this process.')
+        # Hashing is slow on purpose; do it once for every generated user
+        self.password_hash = make_password(self.password) if self.password else '!'
+        self.user_offset = User.objects.filter(username__startswith=self.prefix).count()
+        self.first_post_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+        created = {'users': self.run_stage('users', self.users)}
+        self.load_users()
+        created['follows'] = self.run_stage('follows', self.users)
+        self.timed('follow counters', reconcile_follow_counts)
+        created['posts'] = self.run_stage('posts', self.users * self.posts_per_user)
+        self.load_posts()
+        created['likes'] = self.run_stage('likes', len(self.post_ids) * self.likes_per_post)
+        created['comments'] = self.run_stage('comments', len(self.post_ids) * self.comments_per_post)
+        self.timed('post counters', reconcile_post_counters)
+        created['feed_entries'] = self.run_stage('feed_entries', len(self.post_ids))
+        return created
+
+    # --- Orchestration ---
+
+    def timed(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.log(f'{name}: {time.perf_counter() - start:.1f} s')
+        return result
+
+    def run_stage(self, stage, total):
+        tasks = [(stage, start, min(start + self.batch_size, total)) for start in range(0, total, self.batch_size)]
+        return self.timed(stage, self.run_tasks, tasks)
+
+    def run_tasks(self, tasks):
+        # SQLite has a single writer, and concurrent batches fail with "database is locked"
+        if self.workers <= 1 or len(tasks) <= 1 or connection.vendor == 'sqlite':
+            return sum(self.write_batch(*task) for task in tasks)
+        # Workers get a copy of the current state, so a pool serves one stage
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(pickle.dumps(self),),
+        ) as pool:
+            return sum(pool.map(call_target, [('write_batch', *task) for task in tasks]))
+
+    def write_batch(self, stage, start, stop):
+        """Writes rows start..stop of a stage and returns how many were written."""
+        rng = random.Random(f'{self.seed}:{stage}:{start}')
+        prepare_connection()
+        with explicit_timestamps(
+            Post._meta.get_field('created_at'), Comment._meta.get_field('created_at'),
+            Like._meta.get_field('created_at'), Notification._meta.get_field('timestamp'),
+        ):
+            return getattr(self, f'write_{stage}')(rng, start, stop)
+
+    def load_users(self):
+        self.user_ids = array('q', (
+            User.objects.filter(username__startswith=self.prefix)
+            .order_by('pk').values_list('pk', flat=True).iterator(chunk_size=self.batch_size)
+        ))
+        self.popularity = array('d', itertools.accumulate(
+            1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(len(self.user_ids))
+        ))
+
+    def load_posts(self):
+        self.post_ids, self.post_authors, self.post_times = array('q'), array('q'), array('d')
+        for post_id, author_id, created_at in (
+            Post.objects.filter(pk__gte=self.first_post_id).order_by('pk')
+            .values_list('pk', 'author_id', 'created_at').iterator(chunk_size=self.batch_size)
+        ):
+            self.post_ids.append(post_id)
+            self.post_authors.append(author_id)
+            self.post_times.append(created_at.timestamp())
+        # Posts of popular authors draw most of the engagement
+        self.post_weights = array('d', itertools.accumulate(
+            1 / (bisect.bisect_left(self.user_ids, author_id) + 1) ** ZIPF_EXPONENT
+            for author_id in self.post_authors
+        ))
+
+    # --- Helpers ---
+
+    def timestamp(self, rng, after=None):
+        start = after or (self.now - timedelta(days=self.days)).timestamp()
+        at = start + (self.now.timestamp() - start) * rng.random()
+        return datetime.fromtimestamp(at, tz=dt_timezone.utc)
+
+    def is_read(self, at):
+        return at < self.now - timedelta(days=1)
+
+    def text(self, rng, words):
+        return ' '.join(rng.choices(WORDS, k=words))
+
+    def engagement(self, rng, count):
+        """(post index, user_id) pairs, unique within the batch."""
+        picked = rng.choices(range(len(self.post_ids)), cum_weights=self.post_weights, k=count)
+        return list(dict.fromkeys((index, rng.choice(self.user_ids)) for index in picked))
+
+    # --- Tables ---
+
+    def write_users(self, rng, start, stop):
+        offset = self.user_offset
+        User.objects.bulk_create([
+            User(username=f'{self.prefix}{offset + index}', password=self.password_hash)
+            for index in range(start, stop)
+        ])
+        return stop - start
+
+    def write_follows(self, rng, start, stop):
+        user_type = ContentType.objects.get_for_model(User)
+        edges = []
+        # Earlier runs' users (same prefix) can be followed, but keep their own follows
+        first = len(self.user_ids) - self.users
+        for follower_id in self.user_ids[first + start:first + stop]:
+            count = min(len(self.user_ids) - 1, round(rng.expovariate(1 / self.follows_per_user)))
+            picked = rng.choices(self.user_ids, cum_weights=self.popularity, k=count)
+            edges += [(followed_id, follower_id) for followed_id in set(picked) - {follower_id}]
+
+        with transaction.atomic():
+            # Edges that already exist would be skipped by ignore_conflicts; leave
+            # them out up front so only inserted edges get a notification
+            existing = set(
+                Follow.objects.filter(to_customuser_id__in=self.user_ids[first + start:first + stop])
+                .values_list('from_customuser_id', 'to_customuser_id')
+            )
+            edges = [edge for edge in edges if edge not in existing]
+            notifications = []
+            for followed_id, follower_id in edges:
+                at = self.timestamp(rng)
+                notifications.append(Notification(
+                    recipient_id=followed_id, actor_id=follower_id, verb='followed', content_type=user_type,
+                    object_id=follower_id, timestamp=at, is_read=self.is_read(at),
+                ))
+            # Through rows read (from_customuser=followed user, to_customuser=follower)
+            Follow.objects.bulk_create(
+                [Follow(from_customuser_id=followed_id, to_customuser_id=follower_id)
+                 for followed_id, follower_id in edges],
+                ignore_conflicts=True,
+            )
+            Notification.objects.bulk_create(notifications)
+        return len(edges)
+
+    def write_posts(self, rng, start, stop):
+        Post.objects.bulk_create([
+            Post(author_id=rng.choice(self.user_ids), title=self.text(rng, 4),
+                 content=self.text(rng, rng.randint(10, 60)), created_at=self.timestamp(rng))
+            for _ in range(start, stop)
+        ])
+        return stop - start
+
+    def write_likes(self, rng, start, stop):
+        post_type = ContentType.objects.get_for_model(Post)
+        pairs = [
+            (self.post_ids[index], user_id, self.post_authors[index],
+             self.timestamp(rng, after=self.post_times[index]))
+            for index, user_id in self.engagement(rng, stop - start)
+        ]
+        with transaction.atomic():
+            # Pairs liked in an earlier batch would be skipped by ignore_conflicts;
+            # leave them out up front so only inserted likes get a notification
+            existing = set(
+                Like.objects.filter(post_id__in={post_id for post_id, *_ in pairs})
+                .values_list('post_id', 'user_id')
+            )
+            pairs = [pair for pair in pairs if pair[:2] not in existing]
+            likes, notifications = [], []
+            for post_id, user_id, author_id, at in pairs:
+                likes.append(Like(post_id=post_id, user_id=user_id, created_at=at))
+                if author_id != user_id:
+                    notifications.append(Notification(
+                        recipient_id=author_id, actor_id=user_id, verb='liked', content_type=post_type,
+                        object_id=post_id, timestamp=at, is_read=self.is_read(at),
+                    ))
+            Like.objects.bulk_create(likes, ignore_conflicts=True)
+            Notification.objects.bulk_create(notifications)
+        return len(likes)
+
+    def write_comments(self, rng, start, stop):
+        comments = [
+            Comment(post_id=self.post_ids[index], author_id=user_id, content=self.text(rng, 8),
+                    created_at=self.timestamp(rng, after=self.post_times[index]))
+            for index, user_id in self.engagement(rng, stop - start)
+        ]
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    def write_feed_entries(self, rng, start, stop):
+        """
+        Copies each post of a fanned-out author into its followers' feeds with
+        one INSERT ... SELECT, so the follower lists never pass through Python.
+        """
+        quote = connection.ops.quote_name
+        sql = (
+            f'INSERT INTO {quote(FeedEntry._meta.db_table)} (user_id, post_id, created_at) '
+            f'SELECT f.to_customuser_id, p.id, p.created_at '
+            f'FROM {quote(Post._meta.db_table)} p '
+            f'INNER JOIN {quote(Follow._meta.db_table)} f ON f.from_customuser_id = p.author_id '
+            f'INNER JOIN {quote(User._meta.db_table)} u ON u.id = p.author_id '
+            f'WHERE u.follower_count <= %s AND p.id BETWEEN %s AND %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [FANOUT_MAX_FOLLOWERS, self.post_ids[start], self.post_ids[stop - 1]])
+            return cursor.rowcount